@@ -0,0 +1,381 @@
+"""
+虚拟转移插件离线性能测试
+
+在本地启动模拟的Alist和阿里云盘开放平台服务，生成指定规模的虚拟目录树，测试目录列举、虚拟转移、秒传和清理的吞吐量、
+耗时分位数和内存峰值。需在MoviePilot源码目录下运行，以便导入app模块：
+
+    cd /path/to/MoviePilot
+    python /path/to/MoviePilot-Plugins/benchmarks/faketransfer.py --files 100000 --latency-ms 20
+
+转移使用空实现代替TransferChain，不会识别媒体信息，也不会写入媒体库。
+"""
+import argparse
+import datetime
+import importlib.util
+import itertools
+import json
+import math
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+PLUGIN_FILE = Path(__file__).resolve().parent.parent / 'plugins' / 'faketransfer' / '__init__.py'
+ROOT = '/bench'
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+class SyntheticTree:
+    """
+    按编号惰性生成的目录树：目录k的子目录为 k*fanout+1 ~ k*fanout+fanout，每个目录包含files_per_dir个媒体文件
+    """
+
+    def __init__(self, files: int, files_per_dir: int, fanout: int):
+        self.files = files
+        self.files_per_dir = files_per_dir
+        self.fanout = fanout
+        self.dirs = max(math.ceil(files / files_per_dir), 1)
+
+    @staticmethod
+    def dir_id(path: str):
+        if path == ROOT:
+            return 0
+        name = path.rsplit('/', 1)[-1]
+        if not name.startswith('d') or not name[1:].isdigit():
+            return None
+        return int(name[1:])
+
+    def listing(self, path: str):
+        dir_id = self.dir_id(path)
+        if dir_id is None or dir_id >= self.dirs:
+            return None
+        items = []
+        for child in range(dir_id * self.fanout + 1, dir_id * self.fanout + self.fanout + 1):
+            if child >= self.dirs:
+                break
+            items.append({'name': f'd{child}', 'is_dir': True, 'size': 0,
+                          'modified': '2024-01-01T00:00:00Z'})
+        start = dir_id * self.files_per_dir
+        for i in range(start, min(start + self.files_per_dir, self.files)):
+            items.append({'name': f'S01E{i % 100:02d}.{i}.mkv', 'is_dir': False, 'size': 1024 ** 3 + i,
+                          'modified': '2024-01-01T00:00:00Z', 'hash_info': {'sha1': f'{i:040X}'}})
+        return items
+
+
+class FakeServer:
+    """
+    模拟 /api/fs/list、/api/admin/storage/get 和 adrive/v1.0/openFile/* 接口，支持固定延迟、随机抖动和错误注入
+    """
+
+    def __init__(self, tree: SyntheticTree, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0):
+        self.tree = tree
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.files = {}
+        self.requests = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self._server.server_port}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 头部和正文分开写入，需关闭Nagle算法避免延迟确认造成的额外等待
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code: int, body: dict):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self, body: dict):
+                path = urlparse(self.path).path
+                with server._lock:
+                    server.requests[path] = server.requests.get(path, 0) + 1
+                delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+                if delay:
+                    time.sleep(delay / 1000)
+                if server.error_rate and random.random() < server.error_rate:
+                    code = 429 if path.startswith('/adrive') else 500
+                    return self._reply(code, {'code': 'Injected', 'message': 'injected error'})
+                return self._reply(*server.dispatch(path, parse_qs(urlparse(self.path).query), body))
+
+            def do_GET(self):
+                self._handle({})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self._handle(json.loads(self.rfile.read(length) or b'{}'))
+
+        return Handler
+
+    def dispatch(self, path: str, query: dict, body: dict):
+        if path == '/api/fs/list':
+            items = self.tree.listing(body.get('path'))
+            if items is None:
+                return 200, {'code': 500, 'message': 'object not found', 'data': None}
+            per_page = body.get('per_page') or 0
+            page = body.get('page') or 1
+            content = items[(page - 1) * per_page:page * per_page] if per_page else items
+            return 200, {'code': 200, 'message': 'success', 'data': {'content': content, 'total': len(items)}}
+        if path == '/api/admin/storage/get':
+            return 200, {'code': 200, 'message': 'success', 'data': {
+                'id': int(query.get('id', ['1'])[0]),
+                'driver': 'AliyundriveOpen',
+                'addition': json.dumps({'refresh_token': 'bench', 'oauth_token_url': f'{self.url}/oauth/token'}),
+            }}
+        if path == '/oauth/token':
+            return 200, {'access_token': 'bench', 'refresh_token': 'bench', 'expires_in': 7200}
+        if path == '/adrive/v1.0/openFile/create':
+            with self._lock:
+                file_id = f'{next(self._ids):024x}'
+                self.files[file_id] = {
+                    'file_id': file_id,
+                    'name': body.get('name'),
+                    'created_at': datetime.datetime.utcnow().strftime(TIME_FORMAT)[:-3] + 'Z',
+                }
+            return 200, {'file_id': file_id, 'rapid_upload': True}
+        if path == '/adrive/v1.0/openFile/getDownloadUrl':
+            if body.get('file_id') not in self.files:
+                return 404, {'code': 'NotFound.File'}
+            expiration = datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
+            return 200, {'url': f'{self.url}/download/{body["file_id"]}',
+                         'expiration': expiration.strftime(TIME_FORMAT)[:-3] + 'Z'}
+        if path == '/adrive/v1.0/openFile/list':
+            with self._lock:
+                items = sorted(self.files.values(), key=lambda item: item['created_at'])
+            start = int(body.get('marker') or 0)
+            limit = body.get('limit') or 50
+            next_marker = str(start + limit) if start + limit < len(items) else ''
+            return 200, {'items': items[start:start + limit], 'next_marker': next_marker}
+        if path == '/adrive/v1.0/openFile/delete':
+            with self._lock:
+                if self.files.pop(body.get('file_id'), None):
+                    return 200, {'file_id': body.get('file_id')}
+            return 404, {'code': 'NotFound.File'}
+        return 404, {'code': 'NotFound'}
+
+    def add_expired(self, count: int, hours: int):
+        created = (datetime.datetime.utcnow() - datetime.timedelta(hours=hours)).strftime(TIME_FORMAT)[:-3] + 'Z'
+        with self._lock:
+            for _ in range(count):
+                file_id = f'{next(self._ids):024x}'
+                self.files[file_id] = {'file_id': file_id, 'name': f'{file_id}.mkv', 'created_at': created}
+
+
+class NullTransferChain:
+    """
+    代替TransferChain，只模拟转移耗时
+    """
+
+    def __init__(self, delay_ms: float):
+        self._delay = delay_ms / 1000
+
+    def do_transfer(self, path, **kwargs):
+        if self._delay:
+            time.sleep(self._delay)
+        return True, ''
+
+
+def load_plugin():
+    spec = importlib.util.spec_from_file_location('faketransfer_bench_plugin', PLUGIN_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+class Benchmark:
+
+    def __init__(self, args):
+        self.args = args
+        self.module = load_plugin()
+        self.tree = SyntheticTree(args.files, args.files_per_dir, args.fanout)
+        self.server = FakeServer(self.tree, args.latency_ms, args.jitter_ms, args.error_rate).start()
+        self.temp_dir = Path(tempfile.mkdtemp(prefix='faketransfer-bench-'))
+        self.plugin = self.module.FakeTransfer()
+        # 缓存只保存在内存中，不读写MoviePilot的缓存目录
+        self.cache = {}
+        self.plugin.chain.load_cache = self.cache.get
+        self.plugin.chain.save_cache = lambda content, name: self.cache.__setitem__(name, content)
+        self.plugin.init_plugin({
+            'enabled': True,
+            'alist_host': self.server.url,
+            'alist_token': 'bench',
+            'alist_sync_folder': ROOT,
+            'alist_list_workers': args.list_workers,
+            'alist_storage_id': 1,
+            'fake_temp_path': str(self.temp_dir),
+            'transfer_workers': args.transfer_workers,
+            'aliyun_drive_id': 'bench',
+            'aliyun_parent_file_id': 'root',
+            'max_hour': 24,
+            'rapid_upload_workers': args.upload_workers,
+            'aliyun_rate': args.aliyun_rate,
+            # 模拟服务不区分drive_id，额外账号共用同一个模拟网盘
+            'aliyun_accounts': '\n'.join(f'1,bench{i},root' for i in range(2, args.accounts + 1)),
+        })
+        self.plugin._aliyun_host = self.server.url
+        chain = NullTransferChain(args.transfer_ms)
+        self.plugin._get_transfer_chain = lambda: chain
+        self.results = []
+
+    def close(self):
+        self.plugin.stop_service()
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def measure(self, name: str, func, items: str):
+        if self.args.tracemalloc:
+            tracemalloc.start()
+        start = time.perf_counter()
+        count, latencies = func()
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if self.args.tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        result = {
+            'scenario': name,
+            'items': count,
+            'unit': items,
+            'seconds': round(elapsed, 3),
+            'throughput': round(count / elapsed, 1) if elapsed else 0,
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'peak_mb': round(peak / 1024 ** 2, 1),
+        }
+        self.results.append(result)
+        return result
+
+    def bench_list(self):
+        latencies = []
+        count = 0
+        last = time.perf_counter()
+        # 每个目录从上一个目录返回到本目录返回的间隔
+        for _, files in self.plugin._alist_walk(ROOT):
+            now = time.perf_counter()
+            latencies.append((now - last) * 1000)
+            last = now
+            count += len(files)
+        return count, latencies
+
+    def bench_sync(self):
+        summary = self.plugin._fake_transfer(full=True)
+        return summary['files'], []
+
+    def bench_rapid(self):
+        total = min(self.args.rapid, self.args.files)
+        latencies = []
+
+        def resolve(i):
+            start = time.perf_counter()
+            # 约一半请求为重复文件，用于体现缓存效果
+            file_no = i if i % 2 else i // 2
+            url, _ = self.plugin._resolve_rapid_upload({
+                'file_name': f'{file_no}.mkv', 'size': 1024 ** 3 + file_no, 'sha1': f'{file_no:040X}'
+            })
+            latencies.append((time.perf_counter() - start) * 1000)
+            return bool(url)
+
+        with ThreadPoolExecutor(max_workers=self.args.clients) as executor:
+            ok = sum(executor.map(resolve, range(total)))
+        if ok < total:
+            print(f'秒传失败 {total - ok} 个', file=sys.stderr)
+        return total, latencies
+
+    def bench_clean(self):
+        self.server.add_expired(self.args.clean, 48)
+        summary = self.plugin._aliyun_clean_upload()
+        return summary['scanned'], []
+
+    def run(self):
+        scenarios = {
+            'list': (self.bench_list, 'files'),
+            'sync': (self.bench_sync, 'files'),
+            'rapid': (self.bench_rapid, 'requests'),
+            'clean': (self.bench_clean, 'files'),
+        }
+        for name in self.args.scenarios.split(','):
+            func, unit = scenarios[name]
+            print(json.dumps(self.measure(name, func, unit), ensure_ascii=False), flush=True)
+        report = {
+            'files': self.args.files,
+            'dirs': self.tree.dirs,
+            'results': self.results,
+            'server_requests': self.server.requests,
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'plugin_stats': self.plugin._get_stats(),
+        }
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='虚拟转移插件离线性能测试')
+    parser.add_argument('--files', type=int, default=1000, help='虚拟目录树中的媒体文件数量')
+    parser.add_argument('--files-per-dir', type=int, default=20, help='每个目录的媒体文件数量')
+    parser.add_argument('--fanout', type=int, default=10, help='每个目录的子目录数量')
+    parser.add_argument('--latency-ms', type=float, default=0, help='模拟服务每个请求的固定延迟')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='模拟服务每个请求的随机延迟上限')
+    parser.add_argument('--error-rate', type=float, default=0, help='模拟服务返回错误的概率')
+    parser.add_argument('--list-workers', type=int, default=4, help='目录列举并发数')
+    parser.add_argument('--transfer-workers', type=int, default=1, help='转移并发数')
+    parser.add_argument('--transfer-ms', type=float, default=0, help='模拟每次转移的耗时')
+    parser.add_argument('--upload-workers', type=int, default=4, help='秒传并发数')
+    parser.add_argument('--aliyun-rate', type=float, default=10, help='每个阿里云盘账号每秒最多请求数，0为不限速')
+    parser.add_argument('--accounts', type=int, default=1, help='阿里云盘账号数量')
+    parser.add_argument('--clients', type=int, default=8, help='同时发起秒传的客户端数量')
+    parser.add_argument('--rapid', type=int, default=200, help='秒传请求数量')
+    parser.add_argument('--clean', type=int, default=500, help='待清理的过期文件数量')
+    parser.add_argument('--scenarios', default='list,sync,rapid,clean', help='要执行的测试，逗号分隔')
+    parser.add_argument('--no-tracemalloc', dest='tracemalloc', action='store_false', help='不统计Python内存峰值')
+    parser.add_argument('--output', help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    bench = Benchmark(args)
+    try:
+        report = bench.run()
+    finally:
+        bench.close()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
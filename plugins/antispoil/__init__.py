@@ -34,8 +34,11 @@ class AntiSpoil(_PluginBase):
     # 私有属性
     _enabled = False
     _delay = 0
+    _stats = None
 
     def init_plugin(self, config: dict = None):
+        if not self._stats:
+            self._stats = {'processed': 0, 'failed': 0, 'elapsed': 0.0, 'last_time': None}
         if config:
             self._enabled = config.get("enabled")
             self._delay = config.get("delay") or 0
@@ -108,7 +111,39 @@ class AntiSpoil(_PluginBase):
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        stats = self._stats or {}
+        total = stats.get('processed', 0) + stats.get('failed', 0)
+        rows = [
+            ['已处理', stats.get('processed', 0)],
+            ['失败', stats.get('failed', 0)],
+            ['平均耗时(ms)', round(stats.get('elapsed', 0) / total * 1000, 1) if total else '-'],
+            ['最近处理时间', stats.get('last_time') or '-'],
+        ]
+        return [
+            {
+                'component': 'VTable',
+                'props': {
+                    'hover': True,
+                    'density': 'compact'
+                },
+                'content': [
+                    {
+                        'component': 'tbody',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [
+                                    {
+                                        'component': 'td',
+                                        'text': str(value)
+                                    } for value in row
+                                ]
+                            } for row in rows
+                        ]
+                    }
+                ]
+            }
+        ]
 
     @eventmanager.register(EventType.TransferComplete)
     def hide_plot(self, event: Event):
@@ -137,6 +172,7 @@ class AntiSpoil(_PluginBase):
             nfo_file = nfo_path + '.nfo'
             tile = nfo_path.split('-')[-1].strip()
             if os.path.exists(nfo_file):
+                start = time.time()
                 try:
                     with open(nfo_file, 'r+', encoding='utf-8') as f:
                         logger.info(f'隐藏{nfo_file}剧情信息...')
@@ -149,8 +185,17 @@ class AntiSpoil(_PluginBase):
                                      flags=re.DOTALL)
                         f.write(nfo)
                         f.truncate()
+                    self._record(start)
                 except Exception as e:
                     logger.error('隐藏剧情信息失败：', e)
+                    self._record(start, failed=True)
+
+    def _record(self, start: float, failed: bool = False):
+        if self._stats is None:
+            return
+        self._stats['failed' if failed else 'processed'] += 1
+        self._stats['elapsed'] += time.time() - start
+        self._stats['last_time'] = time.strftime('%Y-%m-%d %H:%M:%S')
 
     def stop_service(self):
         """
@@ -1,15 +1,31 @@
+import asyncio
+import fnmatch
+import hashlib
+import heapq
+import itertools
 import json
+import mmap
 import os
 import pickle
+import posixpath
 import queue
+import re
+import struct
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Any, List, Dict, Tuple
+from typing import Any, List, Dict, Tuple, Optional, Callable
+from urllib.parse import urlparse
 
 import pytz
 import requests
-from apscheduler.schedulers.background import BackgroundScheduler
+from requests.adapters import HTTPAdapter
 from apscheduler.triggers.cron import CronTrigger
 from fastapi import Depends, Request
 
@@ -17,11 +33,980 @@ from app import schemas
 from app.core.config import settings
 from app.chain.transfer import TransferChain
 from app.core.security import verify_apikey
+from app.db import SessionFactory
+from app.db.models.transferhistory import TransferHistory
 from app.db.transferhistory_oper import TransferHistoryOper
 from app.log import logger
 from app.plugins import _PluginBase
 
 
+class HttpClient:
+    """
+    插件共享的HTTP客户端：按host复用连接池，统一超时，对连接错误和5xx响应按指数退避重试，并统计各host的请求数
+    """
+
+    def __init__(self, connect_timeout: float = 5, read_timeout: float = 30, retries: int = 3,
+                 backoff: float = 1, pool_size: int = 10, metrics: 'Metrics' = None):
+        self._timeout = (connect_timeout, read_timeout)
+        self._metrics = metrics
+        self._retries = retries
+        self._backoff = backoff
+        self._pool_size = pool_size
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._endpoint_stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if not session:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def _count(self, host: str, endpoint: str, key: str):
+        with self._lock:
+            for stats, name in ((self._stats, host), (self._endpoint_stats, endpoint)):
+                stat = stats.setdefault(name, {'requests': 0, 'retries': 0, 'errors': 0})
+                stat[key] += 1
+
+    def request(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        发送请求，重试耗尽后返回最后一次响应或抛出最后一次异常
+        :param retry: 请求非幂等时传False，不进行重试
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc
+        endpoint = f'{host}{parsed.path}'
+        session = self._session(host)
+        kwargs.setdefault('timeout', self._timeout)
+        attempts = self._retries + 1 if retry else 1
+        for attempt in range(attempts):
+            if attempt:
+                self._count(host, endpoint, 'retries')
+                time.sleep(self._backoff * 2 ** (attempt - 1))
+            self._count(host, endpoint, 'requests')
+            start = time.time()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count(host, endpoint, 'errors')
+                logger.debug(f'请求{url}失败：{e}')
+                if attempt == attempts - 1:
+                    raise
+                continue
+            finally:
+                if self._metrics:
+                    self._metrics.observe(f'http {endpoint}', (time.time() - start) * 1000)
+            if response.status_code >= 400:
+                self._count(host, endpoint, 'errors')
+                logger.debug(f'请求{url}失败：{response.status_code}')
+                if response.status_code >= 500 and attempt < attempts - 1:
+                    continue
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: dict(stat) for host, stat in self._stats.items()}
+
+    def endpoint_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {endpoint: dict(stat) for endpoint, stat in self._endpoint_stats.items()}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class Metrics:
+    """
+    插件运行指标：各阶段耗时直方图、计数器和最近的转移记录
+    """
+    # 耗时直方图的桶上限，单位：毫秒
+    BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self, max_runs: int = 20):
+        self._stages: Dict[str, dict] = {}
+        self._counters: Dict[str, int] = {}
+        self._runs: List[dict] = []
+        self._max_runs = max_runs
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.time() - start) * 1000)
+
+    def observe(self, stage: str, ms: float):
+        with self._lock:
+            stat = self._stages.get(stage)
+            if not stat:
+                stat = self._stages[stage] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * (len(self.BUCKETS) + 1)
+                }
+            stat['count'] += 1
+            stat['total'] += ms
+            stat['max'] = max(stat['max'], ms)
+            for i, bound in enumerate(self.BUCKETS):
+                if ms <= bound:
+                    stat['buckets'][i] += 1
+                    break
+            else:
+                stat['buckets'][-1] += 1
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def add_run(self, run: dict):
+        with self._lock:
+            self._runs.append(run)
+            del self._runs[:-self._max_runs]
+
+    def _percentile(self, stat: dict, p: float) -> Optional[float]:
+        """
+        根据直方图估算分位数，返回所在桶的上限
+        """
+        target = stat['count'] * p
+        seen = 0
+        for i, count in enumerate(stat['buckets']):
+            seen += count
+            if count and seen >= target:
+                return self.BUCKETS[i] if i < len(self.BUCKETS) else round(stat['max'], 1)
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {}
+            for stage, stat in self._stages.items():
+                stages[stage] = {
+                    'count': stat['count'],
+                    'avg_ms': round(stat['total'] / stat['count'], 1) if stat['count'] else 0,
+                    'p50_ms': self._percentile(stat, 0.5),
+                    'p95_ms': self._percentile(stat, 0.95),
+                    'max_ms': round(stat['max'], 1),
+                    'buckets': dict(zip([*map(str, self.BUCKETS), 'inf'], stat['buckets'])),
+                }
+            return {
+                'stages': stages,
+                'counters': dict(self._counters),
+                'runs': [dict(run) for run in self._runs],
+            }
+
+
+class DownloadUrlCache:
+    """
+    秒传结果缓存，以 (drive_id, sha1, size) 为键缓存已创建的file_id及其下载地址，按LRU淘汰
+    """
+
+    def __init__(self, max_size: int = 1000, url_margin: int = 60):
+        self._max_size = max_size
+        # 下载地址在过期前多少秒视为失效
+        self._url_margin = url_margin
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(drive_id: str, sha1: str, size: int) -> str:
+        return f'{drive_id}:{(sha1 or "").upper()}:{size}'
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return dict(entry) if entry else None
+
+    def get_url(self, key: str) -> Optional[str]:
+        """
+        获取未过期的下载地址
+        """
+        entry = self.get(key)
+        if entry and entry.get('url') and entry.get('expire', 0) - self._url_margin > time.time():
+            self.hits += 1
+            return entry['url']
+        self.misses += 1
+        return None
+
+    def put(self, key: str, file_id: str, created: float, url: str = None, expire: float = 0):
+        if self._max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {
+                'file_id': file_id,
+                'created': created,
+                'url': url,
+                'expire': expire,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def remove(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def remove_file(self, file_id: str):
+        """
+        文件被删除后移除对应缓存
+        """
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v['file_id'] == file_id]:
+                self._entries.pop(key)
+
+    def dumps(self) -> str:
+        with self._lock:
+            return json.dumps(list(self._entries.items()))
+
+    def loads(self, content: str):
+        with self._lock:
+            for key, entry in json.loads(content):
+                self._entries[key] = entry
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
+class AccessToken:
+    """
+    access token内存缓存：过期前在后台提前刷新，并保证同一时间只有一个刷新请求
+    """
+
+    def __init__(self, refresh: Callable[[], Optional[dict]], load: Callable[[], Optional[dict]] = None,
+                 save: Callable[[dict], None] = None, ahead: int = 300):
+        """
+        :param refresh: 刷新token，返回包含access_token和过期时间戳expires_in的字典
+        :param load: 读取持久化的token
+        :param save: 持久化token
+        :param ahead: 提前多少秒刷新
+        """
+        self._refresh = refresh
+        self._load = load
+        self._save = save
+        self._ahead = ahead
+        self._token = None
+        self._expires = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._last_attempt = 0
+
+    def get(self) -> Optional[str]:
+        if not self._loaded:
+            self._load_saved()
+        now = time.time()
+        if self._token and now < self._expires - self._ahead:
+            return self._token
+        if self._token and now < self._expires:
+            # 即将过期，由后台刷新，当前仍使用旧token；刷新失败后30秒内不再重试
+            if now - self._last_attempt > 30 and not self._lock.locked():
+                threading.Thread(target=self._refresh_once, args=(False,), daemon=True).start()
+            return self._token
+        return self._refresh_once(True)
+
+    def _load_saved(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            data = self._load() if self._load else None
+            if data and int(time.time()) < data.get('expires_in', 0):
+                self._token = data['access_token']
+                self._expires = data['expires_in']
+                self._schedule()
+
+    def _refresh_once(self, blocking: bool) -> Optional[str]:
+        """
+        单飞刷新：等待中的调用方直接使用刷新结果
+        """
+        if not self._lock.acquire(blocking=blocking):
+            return self._token
+        try:
+            if self._token and time.time() < self._expires - self._ahead:
+                return self._token
+            self._last_attempt = time.time()
+            data = self._refresh()
+            if not data:
+                logger.error('刷新access token失败')
+                return self._token if time.time() < self._expires else None
+            self._token = data['access_token']
+            self._expires = data['expires_in']
+            if self._save:
+                self._save(data)
+            self._schedule()
+            return self._token
+        finally:
+            self._lock.release()
+
+    def _schedule(self):
+        if self._timer:
+            self._timer.cancel()
+        if self._closed:
+            return
+        delay = max(self._expires - self._ahead - time.time(), 1)
+        self._timer = threading.Timer(delay, self._refresh_once, args=(False,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def close(self):
+        self._closed = True
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+class RateLimiter:
+    """
+    自适应令牌桶限速：按优先级分配令牌，收到429后减半速率并暂停，请求成功后逐步恢复
+    """
+    # 优先级，数值越小越优先
+    INTERACTIVE = 0
+    PREFETCH = 1
+    BACKGROUND = 2
+
+    def __init__(self, rate: float, burst: float = None, min_rate: float = 0.5, reserve: float = None):
+        """
+        :param rate: 每秒最多请求数
+        :param burst: 令牌桶容量，默认与rate相同
+        :param min_rate: 降速后的最低速率
+        :param reserve: 为交互请求保留的令牌数，后台请求不能使用，默认为容量的1/4，不超过容量减1
+        """
+        self._max_rate = rate
+        self._rate = rate
+        self._min_rate = min(min_rate, rate)
+        self._burst = burst or max(rate, 1)
+        reserve = self._burst / 4 if reserve is None else reserve
+        # 后台请求需要 1 + reserve 个令牌，超过容量时永远无法获取
+        self._reserve = max(min(reserve, self._burst - 1), 0)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: float = None) -> bool:
+        """
+        获取一个令牌，同时等待时高优先级先获取，超时返回False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        need = 1 if priority == self.INTERACTIVE else 1 + self._reserve
+        with self._cond:
+            self._seq += 1
+            waiter = (priority, self._seq)
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    head = self._waiters[0] == waiter
+                    if head and now >= self._paused_until and self._tokens >= need:
+                        self._tokens -= 1
+                        return True
+                    if deadline is not None and now >= deadline:
+                        return False
+                    # 只有队首按令牌恢复时间等待，其余等待队首离开后唤醒
+                    wait_time = max(self._paused_until - now, (need - self._tokens) / self._rate) if head else None
+                    if deadline is not None:
+                        wait_time = min(wait_time if wait_time is not None else deadline - now, deadline - now)
+                    self._cond.wait(wait_time)
+            finally:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def throttle(self, retry_after: float = None):
+        """
+        被限流：清空令牌并暂停到Retry-After之后，同一次暂停内的多次限流只降速一次
+        """
+        with self._cond:
+            now = time.monotonic()
+            self.throttled += 1
+            if now >= self._paused_until:
+                self._rate = max(self._rate / 2, self._min_rate)
+            self._tokens = 0
+            self._updated = now
+            self._paused_until = max(self._paused_until, now + (retry_after or 1 / self._rate))
+            self._cond.notify_all()
+
+    def success(self):
+        """
+        请求成功，每次恢复最大速率的5%
+        """
+        if self._rate >= self._max_rate:
+            return
+        with self._cond:
+            self._rate = min(self._max_rate, self._rate + self._max_rate * 0.05)
+
+    def paused(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                'rate': round(self._rate, 2),
+                'max_rate': self._max_rate,
+                'tokens': round(self._tokens, 2),
+                'waiting': len(self._waiters),
+                'throttled': self.throttled,
+            }
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """
+    解析Retry-After响应头，支持秒数和HTTP日期
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(pytz.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _modified_ts(value: Optional[str]) -> float:
+    """
+    解析Alist返回的修改时间，无法解析时返回0
+    """
+    if not value:
+        return 0
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0
+
+
+def _sha1_to_bytes(sha1: Optional[str]) -> bytes:
+    try:
+        data = bytes.fromhex(sha1 or '')
+    except ValueError:
+        data = b''
+    return data if len(data) == 20 else b'\0' * 20
+
+
+def _sha1_from_bytes(data: bytes) -> Optional[str]:
+    return data.hex().upper() if data.strip(b'\0') else None
+
+
+class FakeStub:
+    """
+    虚拟文件格式：固定头部（魔数、版本、源路径长度、文件大小、sha1）+ utf-8编码的源路径，兼容读取旧版pickle格式
+    """
+    MAGIC = b'FTST'
+    VERSION = 1
+    _header = struct.Struct('<4sBxHQ20s')
+
+    @classmethod
+    def dump(cls, path, src: str, size: int, sha1: Optional[str]):
+        src_data = (src or '').encode('utf-8')[:0xFFFF]
+        with open(path, 'wb') as f:
+            f.write(cls._header.pack(cls.MAGIC, cls.VERSION, len(src_data), size or 0, _sha1_to_bytes(sha1)))
+            f.write(src_data)
+
+    @classmethod
+    def load(cls, path) -> dict:
+        with open(path, 'rb') as f:
+            header = f.read(cls._header.size)
+            if len(header) == cls._header.size and header[:4] == cls.MAGIC:
+                _, version, src_len, size, sha1 = cls._header.unpack(header)
+                return {
+                    'src': f.read(src_len).decode('utf-8'),
+                    'size': size,
+                    'sha1': _sha1_from_bytes(sha1),
+                }
+            f.seek(0)
+            return pickle.load(f)
+
+
+class StubIndex:
+    """
+    虚拟文件索引：以媒体库中的虚拟文件路径为键的开放寻址哈希表，通过mmap读取，查询时无需打开虚拟文件
+    文件结构：头部（魔数、版本、槽位数、条目数）+ 槽位（路径哈希、大小、sha1、源路径偏移和长度）+ 源路径字符串
+    """
+    MAGIC = b'FTSI'
+    VERSION = 1
+    _header = struct.Struct('<4sB3xII')
+    _slot = struct.Struct('<QQ20sIH')
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._slots, self.count = self._header.unpack_from(self._mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self._mm.close()
+            raise ValueError(f'索引文件格式错误：{path}')
+        self._heap = self._header.size + self._slots * self._slot.size
+
+    @staticmethod
+    def key(path) -> int:
+        digest = hashlib.blake2b(os.path.normpath(str(path)).encode('utf-8'), digest_size=8).digest()
+        # 0 表示空槽位
+        return int.from_bytes(digest, 'little') or 1
+
+    def _read_slot(self, i: int) -> Tuple[int, int, bytes, str]:
+        key, size, sha1, src_off, src_len = self._slot.unpack_from(self._mm, self._header.size + i * self._slot.size)
+        src = self._mm[self._heap + src_off:self._heap + src_off + src_len].decode('utf-8') if key else ''
+        return key, size, sha1, src
+
+    def get(self, path) -> Optional[dict]:
+        key = self.key(path)
+        mask = self._slots - 1
+        i = key & mask
+        for _ in range(self._slots):
+            slot_key, size, sha1, src = self._read_slot(i)
+            if not slot_key:
+                return None
+            if slot_key == key:
+                return {'src': src, 'size': size, 'sha1': _sha1_from_bytes(sha1)}
+            i = (i + 1) & mask
+        return None
+
+    def items(self) -> Dict[int, Tuple[int, bytes, str]]:
+        ret = {}
+        for i in range(self._slots):
+            key, size, sha1, src = self._read_slot(i)
+            if key:
+                ret[key] = (size, sha1, src)
+        return ret
+
+    def close(self):
+        self._mm.close()
+
+    @classmethod
+    def write(cls, path, entries: Dict[int, Tuple[int, bytes, str]]):
+        """
+        写入索引，entries为 {路径哈希: (大小, sha1, 源路径)}
+        """
+        slots = 16
+        while slots < len(entries) * 2:
+            slots *= 2
+        table = [None] * slots
+        heap = bytearray()
+        for key, (size, sha1, src) in entries.items():
+            src_data = (src or '').encode('utf-8')[:0xFFFF]
+            i = key & (slots - 1)
+            while table[i]:
+                i = (i + 1) & (slots - 1)
+            table[i] = cls._slot.pack(key, size or 0, sha1, len(heap), len(src_data))
+            heap.extend(src_data)
+        empty = cls._slot.pack(0, 0, b'\0' * 20, 0, 0)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(cls._header.pack(cls.MAGIC, cls.VERSION, slots, len(entries)))
+            for slot in table:
+                f.write(slot or empty)
+            f.write(heap)
+        os.replace(tmp, path)
+
+
+class ExpiryIndex:
+    """
+    已上传文件的过期索引：按过期时间排序的最小堆，到期时只需取出堆顶文件，无需遍历目录
+    """
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._file_ids = set()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._file_ids)
+
+    def add(self, file_id: str, name: str, expire: float, attempts: int = 0):
+        with self._lock:
+            if file_id in self._file_ids:
+                return
+            self._file_ids.add(file_id)
+            heapq.heappush(self._heap, [expire, file_id, name, attempts])
+            self._dirty = True
+
+    def remove(self, file_id: str):
+        """
+        文件已被其他方式删除，堆中的条目在到期时丢弃
+        """
+        with self._lock:
+            if file_id in self._file_ids:
+                self._file_ids.discard(file_id)
+                self._dirty = True
+
+    def pop_due(self, now: float) -> List[Tuple[str, str, int]]:
+        """
+        取出所有已到期的文件 (file_id, 文件名, 已重试次数)
+        """
+        ret = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, file_id, name, attempts = heapq.heappop(self._heap)
+                if file_id in self._file_ids:
+                    self._file_ids.discard(file_id)
+                    ret.append((file_id, name, attempts))
+            self._dirty = self._dirty or bool(ret)
+        return ret
+
+    def changed(self) -> bool:
+        """
+        上次调用后索引是否有变化
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+            return dirty
+
+    def dumps(self) -> str:
+        with self._lock:
+            return json.dumps([item for item in self._heap if item[1] in self._file_ids])
+
+    def loads(self, content: str):
+        for expire, file_id, name, attempts in json.loads(content):
+            self.add(file_id, name, expire, attempts)
+
+
+class ContentIndex:
+    """
+    内容索引：以sha1和大小为键记录首个转移成功的源路径，用于识别不同目录下的相同文件
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._sources)
+
+    @staticmethod
+    def key(sha1: Optional[str], size: int) -> Optional[str]:
+        return f'{sha1.upper()}:{size}' if sha1 else None
+
+    def owner(self, sha1: Optional[str], size: int, src: str) -> Optional[str]:
+        """
+        相同内容已由其他源路径转移时返回该路径
+        """
+        key = self.key(sha1, size)
+        if not key:
+            return None
+        with self._lock:
+            first = self._sources.get(key)
+        return first if first and first != src else None
+
+    def confirm(self, sha1: Optional[str], size: int, src: str):
+        """
+        文件转移成功后登记内容，已登记的内容保留原路径
+        """
+        key = self.key(sha1, size)
+        if not key:
+            return
+        with self._lock:
+            if key not in self._sources:
+                self._sources[key] = src
+                self._dirty = True
+
+    def prune(self, root: str, seen: set):
+        """
+        全量列举目录后，移除该目录下已不存在的源路径
+        """
+        prefix = root.rstrip('/') + '/'
+        with self._lock:
+            stale = [key for key, src in self._sources.items() if src.startswith(prefix) and src not in seen]
+            for key in stale:
+                del self._sources[key]
+            self._dirty = self._dirty or bool(stale)
+
+    def dumps(self) -> Optional[str]:
+        """
+        没有变化时返回None
+        """
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            return json.dumps(self._sources)
+
+    def loads(self, content: str):
+        with self._lock:
+            self._sources.update(json.loads(content))
+
+
+class AliyunAccount:
+    """
+    秒传使用的阿里云盘账号，每个账号有独立的token、限速器和到期索引
+    """
+
+    def __init__(self, storage_id, drive_id: str, parent_file_id: str, primary: bool = False):
+        """
+        :param storage_id: 账号在Alist中的存储ID，用于读取refresh token
+        :param primary: 是否为原有的单账号配置，沿用原有的缓存文件
+        """
+        self.storage_id = storage_id
+        self.drive_id = drive_id
+        self.parent_file_id = parent_file_id
+        self.primary = primary
+        self.refresh_token = None
+        self.oauth_token_url = ''
+        self.token: Optional[AccessToken] = None
+        self.limiter: Optional[RateLimiter] = None
+        self.expiry = ExpiryIndex()
+
+    def cache_name(self, name: str) -> str:
+        return name if self.primary else f'{name.rstrip("_")}_{self.drive_id}__'
+
+    def weight(self, sha1: str) -> int:
+        """
+        rendezvous哈希权重，增减账号时只有少部分文件改变所属账号
+        """
+        digest = hashlib.blake2b(f'{self.drive_id}:{sha1}'.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def throttled(self) -> bool:
+        return bool(self.limiter and self.limiter.paused())
+
+    def close(self):
+        if self.token:
+            self.token.close()
+
+
+class PathRules:
+    """
+    路径过滤规则，每行一条，不区分大小写：默认为glob，包含"/"时匹配完整路径，否则匹配名称；以"re:"开头为正则，在完整路径中搜索
+    """
+
+    def __init__(self, rules: str = None):
+        names, paths, regexes = [], [], []
+        for line in (rules or '').splitlines():
+            rule = line.strip()
+            if not rule or rule.startswith('#'):
+                continue
+            if rule.startswith('re:'):
+                pattern, target = rule[3:], regexes
+            else:
+                pattern, target = fnmatch.translate(rule), paths if '/' in rule else names
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logger.error(f'过滤规则{rule}无效：{e}')
+                continue
+            target.append(pattern)
+        # 同类规则合并为一个正则，每个路径只需匹配一次
+        self._name = self._compile(names)
+        self._path = self._compile(paths)
+        self._regex = self._compile(regexes)
+
+    @staticmethod
+    def _compile(patterns: List[str]):
+        return re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE) if patterns else None
+
+    def __bool__(self):
+        return bool(self._name or self._path or self._regex)
+
+    def match(self, path: str, name: str) -> bool:
+        return bool((self._name and self._name.match(name))
+                    or (self._path and self._path.match(path))
+                    or (self._regex and self._regex.search(path)))
+
+
+class TransferJobs:
+    """
+    同步任务队列：按目录记录转移进度并定期保存，中断后从未完成的目录继续，转移失败的目录按指数退避重试
+    """
+    # 待列举：目录已发现但尚未列举，恢复时从这些目录继续遍历
+    PENDING = 'pending'
+    # 已列举：已获取目录下的媒体文件，等待生成虚拟文件
+    LISTED = 'listed'
+    # 已生成虚拟文件，等待转移
+    STUBBED = 'stubbed'
+    TRANSFERRED = 'transferred'
+    FAILED = 'failed'
+
+    def __init__(self, max_attempts: int = 5, backoff: int = 600, max_list_attempts: int = 3):
+        """
+        :param max_attempts: 转移失败的最大重试次数，超过后放弃
+        :param backoff: 首次重试间隔秒数，之后每次翻倍
+        :param max_list_attempts: 目录列举失败的最大次数，超过后移出队列；继续同步连续这么多次列举失败后重新遍历
+        """
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._max_list_attempts = max_list_attempts
+        # {目录: {"root": 同步目录, "state": 状态, "files": [文件信息], "attempts": 失败次数, "retry_at": 重试时间,
+        #        "list_attempts": 列举失败次数}}
+        self._jobs: Dict[str, dict] = {}
+        # 未完成的同步：{同步目录: 开始时间}
+        self._runs: Dict[str, int] = {}
+        # 未完成的同步中出现列举失败的次数：{同步目录: 次数}
+        self._failures: Dict[str, int] = {}
+        # 本次同步中已出现列举失败的同步目录
+        self._run_failed = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def start(self, root: str) -> bool:
+        """
+        开始同步，返回是否为继续上一次未完成的同步
+        """
+        with self._lock:
+            self._run_failed.discard(root)
+            if root in self._runs:
+                if self._failures.get(root, 0) < self._max_list_attempts:
+                    return True
+                # 多次继续同步都有目录列举失败，放弃上一次同步重新遍历，转移失败的目录保留重试状态
+                self._jobs = {folder: job for folder, job in self._jobs.items()
+                              if job['root'] != root or job['state'] == self.FAILED}
+            self._runs[root] = int(time.time())
+            self._failures.pop(root, None)
+            self._jobs[root] = {'root': root, 'state': self.PENDING}
+            self._dirty = True
+            return False
+
+    def pending(self, root: str) -> List[str]:
+        with self._lock:
+            return [folder for folder, job in self._jobs.items()
+                    if job['root'] == root and job['state'] == self.PENDING]
+
+    def ready(self, root: str) -> List[Tuple[str, List[dict]]]:
+        """
+        已列举但未转移完成的目录
+        """
+        with self._lock:
+            return [(folder, job['files']) for folder, job in self._jobs.items()
+                    if job['root'] == root and job['state'] in (self.LISTED, self.STUBBED)]
+
+    def deferred(self, folder: str, now: float) -> bool:
+        """
+        目录转移失败且未到重试时间时返回True，并恢复为失败状态
+        """
+        with self._lock:
+            job = self._jobs.get(folder)
+            if not job or job.get('retry_at', 0) <= now:
+                return False
+            job['state'] = self.FAILED
+            self._dirty = True
+            return True
+
+    def set(self, folder: str, state: str, root: str = None, files: List[dict] = None):
+        with self._lock:
+            job = self._jobs.get(folder)
+            if not job:
+                if not root:
+                    return
+                job = self._jobs[folder] = {'root': root}
+            job['state'] = state
+            if files is not None:
+                job['files'] = files
+            elif state == self.TRANSFERRED:
+                job.pop('files', None)
+            self._dirty = True
+
+    def remove(self, folder: str):
+        with self._lock:
+            if self._jobs.pop(folder, None):
+                self._dirty = True
+
+    def fail(self, folder: str, root: str, files: List[dict]) -> bool:
+        """
+        记录转移失败，返回是否还会重试
+        """
+        with self._lock:
+            job = self._jobs.setdefault(folder, {'root': root})
+            attempts = job.get('attempts', 0) + 1
+            self._dirty = True
+            if attempts > self._max_attempts:
+                self._jobs.pop(folder)
+                return False
+            job.update(state=self.FAILED, files=files, attempts=attempts,
+                       retry_at=int(time.time() + self._backoff * 2 ** (attempts - 1)))
+            return True
+
+    def list_failed(self, folder: str, root: str, missing: bool = False) -> bool:
+        """
+        记录目录列举失败，目录不存在或多次列举失败时移出队列，返回是否还会重试
+        """
+        with self._lock:
+            self._dirty = True
+            if not missing and root not in self._run_failed:
+                self._run_failed.add(root)
+                self._failures[root] = self._failures.get(root, 0) + 1
+            job = self._jobs.get(folder)
+            if not job:
+                return not missing
+            attempts = job.get('list_attempts', 0) + 1
+            if missing or attempts >= self._max_list_attempts:
+                self._jobs.pop(folder)
+                return False
+            job['list_attempts'] = attempts
+            return True
+
+    def finish(self, root: str) -> bool:
+        """
+        所有目录均已列举和转移时结束本次同步并清理已完成的目录，失败的目录保留重试次数和时间
+        """
+        with self._lock:
+            states = {job['state'] for job in self._jobs.values() if job['root'] == root}
+            if states & {self.PENDING, self.LISTED, self.STUBBED}:
+                return False
+            self._jobs = {folder: job for folder, job in self._jobs.items()
+                          if job['root'] != root or job['state'] != self.TRANSFERRED}
+            self._runs.pop(root, None)
+            self._failures.pop(root, None)
+            self._dirty = True
+            return True
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {state: 0 for state in (self.PENDING, self.LISTED, self.STUBBED, self.TRANSFERRED, self.FAILED)}
+            for job in self._jobs.values():
+                counts[job['state']] += 1
+            return counts
+
+    def dumps(self) -> Optional[str]:
+        """
+        返回序列化内容，没有变化时返回None
+        """
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            return json.dumps({'runs': self._runs, 'jobs': self._jobs, 'failures': self._failures})
+
+    def loads(self, content: str):
+        data = json.loads(content)
+        with self._lock:
+            self._runs = data.get('runs') or {}
+            self._jobs = data.get('jobs') or {}
+            self._failures = data.get('failures') or {}
+
+
 class FakeTransfer(_PluginBase):
     # 插件名称
     plugin_name = "虚拟转移"
@@ -45,11 +1030,44 @@ class FakeTransfer(_PluginBase):
     # 私有属性
     transfer_his = None
     _transfer_type = 'move'
-    _transfer = None
+    _transfer_local = None
     _aliyun_host = 'https://openapi.aliyundrive.com'
     _cache_file_name = '__fake_transfer__'
-    _refresh_token = None
-    _oauth_token_url = ''
+    _index_dir_name = '.fake_index'
+    _snapshot_file_name = '__fake_transfer_snapshot__'
+    _url_cache_file_name = '__fake_transfer_url_cache__'
+    _expiry_file_name = '__fake_transfer_expiry__'
+    _jobs_file_name = '__fake_transfer_jobs__'
+    _content_file_name = '__fake_transfer_content__'
+    # Alist列举目录时每页数量
+    _alist_per_page = 200
+    # 已列举完成、等待转移的目录数量上限
+    _alist_walk_buffer = 64
+    # 批量秒传单次最大数量
+    _rapid_upload_batch_max = 500
+    # 清理加速文件时同时删除的数量
+    _clean_workers = 4
+    # 到期文件删除失败时的最大重试次数
+    _expire_retries = 3
+    # 同步时目录的处理顺序：名称 -> 根据 (目录, 修改时间戳) 返回排序值的函数，排序值小的先处理
+    _folder_orders: Dict[str, Callable[[str, float], Any]] = {
+        'newest': lambda folder, modified: -modified,
+        'oldest': lambda folder, modified: modified,
+        'path': lambda folder, modified: folder,
+        'discovery': lambda folder, modified: 0,
+    }
+    # 同步任务保存间隔，单位：秒
+    _jobs_checkpoint_interval = 10
+    _jobs_saved_at = 0
+    _accounts: List[AliyunAccount] = []
+    _http: Optional[HttpClient] = None
+    _upload_executor: Optional[ThreadPoolExecutor] = None
+    _url_cache: Optional[DownloadUrlCache] = None
+    _metrics: Optional[Metrics] = None
+    _jobs: Optional[TransferJobs] = None
+    _stub_indexes: Dict[str, Tuple[float, StubIndex]] = {}
+    _stub_index_lock = threading.Lock()
+    _stub_index_write_lock = threading.Lock()
 
     # 页面配置属性
     _enabled = False
@@ -57,17 +1075,74 @@ class FakeTransfer(_PluginBase):
     _alist_host = ''
     _alist_token = ''
     _alist_sync_folder = ''
+    _alist_list_workers = 4
     _sync_cron = ''
+    _incremental_sync = False
+    _full_sync_hour = 24
+    _sync_debounce = 30
+    _transfer_workers = 1
+    _sync_roots = ''
+    _sync_parallel = 2
+    _folder_order = 'newest'
+    _sync_time_budget = 0
+    # 同步目录：[{"path": 目录, "cron": 同步周期, "workers": 转移并发数, "priority": 优先级}]
+    _roots: List[Dict[str, Any]] = []
+    _exclude_rules = ''
+    _include_rules = ''
+    _min_file_size = 0
+    _exclude: Optional[PathRules] = None
+    _include: Optional[PathRules] = None
     _fake_temp_path = None
     #
     _alist_storage_id = 0
     _aliyun_drive_id = ''
     _aliyun_parent_file_id = ''
+    _aliyun_accounts = ''
     _max_hour = 24
     _clean_rcon = ''
+    _connect_timeout = 5
+    _read_timeout = 30
+    _http_retries = 3
+    _rapid_upload_workers = 4
+    _url_cache_size = 1000
+    _url_cache_persist = False
+    _prefetch_max_items = 0
+    _prefetch_rate = 20
+    _aliyun_rate = 10
+    # 预加载和清理等非交互请求等待限速的最长时间，单位：秒
+    _aliyun_background_timeout = 300
+    _prefetch_stop: Optional[threading.Event] = None
+    # 同步任务在共用的线程池中执行，_sync_queued为等待执行的 {目录: 是否全量}，_sync_active为正在同步的目录
+    _sync_executor: Optional[ThreadPoolExecutor] = None
+    _sync_lock = threading.Lock()
+    _sync_queued: Dict[str, bool] = {}
+    _sync_active: set = set()
+    _snapshot_lock = threading.Lock()
+    _jobs_save_lock = threading.Lock()
+    # 重复文件处理方式：off不检查，detect只统计，skip跳过
+    _duplicate_mode = 'off'
+    _content_index: Optional[ContentIndex] = None
+    _content_save_lock = threading.Lock()
+    # 正在秒传的文件 {缓存键: [锁, 等待数]}，相同文件同时只秒传一次
+    _upload_inflight: Dict[str, list] = {}
+    _upload_inflight_lock = threading.Lock()
+    _sync_stop: Optional[threading.Event] = None
+    # 等待同步的变更目录 {目录: (首次请求时间, 同步时间)}
+    _debounce_paths: Dict[str, Tuple[float, float]] = {}
+    _debounce_timer: Optional[threading.Timer] = None
+    _prefetch_thread: Optional[threading.Thread] = None
 
     def init_plugin(self, config: dict = None):
-        self._transfer = TransferChain()
+        # 每个转移线程使用独立的TransferChain
+        self._transfer_local = threading.local()
+        if not self._sync_stop:
+            # 停止前启动的同步可能仍在转移已提交的目录，保留锁和正在同步的目录，结束前不会再次同步这些目录
+            self._sync_queued = {}
+            self._debounce_paths = {}
+            self._sync_stop = threading.Event()
+        self._stub_indexes = {}
+        if not self._metrics:
+            self._metrics = Metrics()
         self.transfer_his = TransferHistoryOper()
         if config:
             self._enabled = config.get("enabled")
@@ -75,40 +1150,131 @@ class FakeTransfer(_PluginBase):
             self._alist_host = config.get("alist_host")
             self._alist_token = config.get("alist_token")
             self._alist_sync_folder = config.get("alist_sync_folder")
+            self._alist_list_workers = int(config.get("alist_list_workers") or 4)
             self._fake_temp_path = config.get("fake_temp_path")
             self._alist_storage_id = config.get("alist_storage_id")
             self._sync_cron = config.get("sync_cron")
+            self._incremental_sync = config.get("incremental_sync")
+            self._full_sync_hour = int(config.get("full_sync_hour") or 0)
+            sync_debounce = config.get("sync_debounce")
+            self._sync_debounce = int(sync_debounce) if sync_debounce not in (None, '') else 30
+            self._transfer_workers = int(config.get("transfer_workers") or 1)
+            self._sync_roots = config.get("sync_roots") or ''
+            self._sync_parallel = int(config.get("sync_parallel") or 2)
+            self._folder_order = config.get("folder_order") or 'newest'
+            self._sync_time_budget = float(config.get("sync_time_budget") or 0)
+            self._roots = self._load_roots()
+            self._exclude_rules = config.get("exclude_rules") or ''
+            self._include_rules = config.get("include_rules") or ''
+            self._min_file_size = float(config.get("min_file_size") or 0)
+            self._duplicate_mode = config.get("duplicate_mode") or 'off'
+            # 遍历时逐个目录和文件匹配，规则只编译一次
+            self._exclude = PathRules(self._exclude_rules)
+            self._include = PathRules(self._include_rules)
             self._aliyun_drive_id = config.get("aliyun_drive_id")
             self._aliyun_parent_file_id = config.get("aliyun_parent_file_id")
+            self._aliyun_accounts = config.get("aliyun_accounts") or ''
             self._max_hour = int(config.get("max_hour"))
             self._clean_rcon = config.get("clean_rcon")
+            self._connect_timeout = float(config.get("connect_timeout") or 5)
+            self._read_timeout = float(config.get("read_timeout") or 30)
+            http_retries = config.get("http_retries")
+            self._http_retries = int(http_retries) if http_retries not in (None, '') else 3
+            self._rapid_upload_workers = int(config.get("rapid_upload_workers") or 4)
+            url_cache_size = config.get("url_cache_size")
+            self._url_cache_size = int(url_cache_size) if url_cache_size not in (None, '') else 1000
+            self._url_cache_persist = config.get("url_cache_persist")
+            self._prefetch_max_items = int(config.get("prefetch_max_items") or 0)
+            self._prefetch_rate = int(config.get("prefetch_rate") or 20)
+            aliyun_rate = config.get("aliyun_rate")
+            self._aliyun_rate = float(aliyun_rate) if aliyun_rate not in (None, '') else 10
+
+            # 重新加载配置时关闭旧的连接池
+            if self._http:
+                self._http.close()
+            self._http = HttpClient(connect_timeout=self._connect_timeout, read_timeout=self._read_timeout,
+                                    retries=self._http_retries, pool_size=max(10, self._alist_list_workers),
+                                    metrics=self._metrics)
+            # 秒传在独立线程池中执行，线程数即同时解析的最大数量，避免阻塞事件循环
+            if self._upload_executor:
+                self._upload_executor.shutdown(wait=False)
+            self._upload_executor = ThreadPoolExecutor(max_workers=max(self._rapid_upload_workers, 1),
+                                                       thread_name_prefix='rapid-upload')
+            self._url_cache = DownloadUrlCache(max_size=self._url_cache_size)
+            if self._url_cache_persist:
+                content = self.chain.load_cache(self._url_cache_file_name)
+                if content:
+                    try:
+                        self._url_cache.loads(content)
+                    except Exception as e:
+                        logger.error(f'读取秒传缓存失败：{e}')
+            # 只在首次加载，保存配置时同步可能正在进行，需继续使用同一个任务队列
+            if self._jobs is None:
+                self._jobs = TransferJobs()
+                content = self.chain.load_cache(self._jobs_file_name)
+                if content:
+                    try:
+                        self._jobs.loads(content)
+                    except Exception as e:
+                        logger.error(f'读取同步任务失败：{e}')
+            if self._duplicate_mode == 'off':
+                self._content_index = None
+            elif self._content_index is None:
+                # 与同步任务相同，保存配置时不替换正在同步中使用的索引
+                self._content_index = ContentIndex()
+                content = self.chain.load_cache(self._content_file_name)
+                if content:
+                    try:
+                        self._content_index.loads(content)
+                    except Exception as e:
+                        logger.error(f'读取内容索引失败：{e}')
 
-            self._refresh_token = self._get_refresh_token()
+            for account in self._accounts:
+                self.chain.save_cache(account.expiry.dumps(), account.cache_name(self._expiry_file_name))
+                account.close()
+            self._accounts = self._load_accounts()
             self.update_config({
                 "enabled": self._enabled,
                 "notify": self._notify,
                 "alist_host": self._alist_host,
                 "alist_token": self._alist_token,
                 "alist_sync_folder": self._alist_sync_folder,
+                "alist_list_workers": self._alist_list_workers,
                 "alist_storage_id": self._alist_storage_id,
                 "fake_temp_path": self._fake_temp_path,
                 "sync_cron": self._sync_cron,
+                "incremental_sync": self._incremental_sync,
+                "full_sync_hour": self._full_sync_hour,
+                "sync_debounce": self._sync_debounce,
+                "transfer_workers": self._transfer_workers,
+                "sync_roots": self._sync_roots,
+                "sync_parallel": self._sync_parallel,
+                "folder_order": self._folder_order,
+                "sync_time_budget": self._sync_time_budget,
+                "exclude_rules": self._exclude_rules,
+                "include_rules": self._include_rules,
+                "min_file_size": self._min_file_size,
+                "duplicate_mode": self._duplicate_mode,
                 "aliyun_drive_id": self._aliyun_drive_id,
                 "aliyun_parent_file_id": self._aliyun_parent_file_id,
+                "aliyun_accounts": self._aliyun_accounts,
                 "max_hour": self._max_hour,
                 "clean_rcon": self._clean_rcon,
+                "connect_timeout": self._connect_timeout,
+                "read_timeout": self._read_timeout,
+                "http_retries": self._http_retries,
+                "rapid_upload_workers": self._rapid_upload_workers,
+                "url_cache_size": self._url_cache_size,
+                "url_cache_persist": self._url_cache_persist,
+                "prefetch_max_items": self._prefetch_max_items,
+                "prefetch_rate": self._prefetch_rate,
+                "aliyun_rate": self._aliyun_rate,
             })
 
             mtp = config.get("manual_transfer_path", None)
             if mtp:
                 logger.warn('执行单次转移...')
-                scheduler = BackgroundScheduler(timezone=settings.TZ)
-                scheduler.add_job(func=self._fake_transfer, trigger='date', args=[mtp],
-                                  run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3))
-                if scheduler.get_jobs():
-                    # 启动服务
-                    scheduler.print_jobs()
-                    scheduler.start()
+                self._request_sync(mtp, full=True)
 
     def get_state(self) -> bool:
         return self._enabled
@@ -116,12 +1282,15 @@ class FakeTransfer(_PluginBase):
     def get_service(self) -> List[Dict[str, Any]]:
         ret = []
         if self._enabled:
-            if self._sync_cron:
+            for i, root in enumerate(self._roots):
+                if not root['cron']:
+                    continue
                 ret.append({
-                    "id": "FakeTransfer",
-                    "name": "虚拟转移",
-                    "trigger": CronTrigger.from_crontab(self._sync_cron),
-                    "func": self._fake_transfer,
+                    "id": "FakeTransfer" if i == 0 else f"FakeTransfer{i}",
+                    "name": "虚拟转移" if i == 0 else f"虚拟转移 {root['path']}",
+                    "trigger": CronTrigger.from_crontab(root['cron']),
+                    # kwargs为触发器参数，调用参数需绑定到func上
+                    "func": partial(self._request_sync, path=root['path'], cron=True),
                     "kwargs": {}
                 })
 
@@ -134,6 +1303,15 @@ class FakeTransfer(_PluginBase):
                     "kwargs": {}
                 })
 
+            if self._accounts and self._expire_enabled():
+                ret.append({
+                    "id": "ExpireRapidUpload",
+                    "name": "删除到期上传文件",
+                    "trigger": "interval",
+                    "func": self._aliyun_expire_upload,
+                    "kwargs": {"minutes": 1}
+                })
+
         return ret
 
     @staticmethod
@@ -147,6 +1325,24 @@ class FakeTransfer(_PluginBase):
             "methods": ["POST"],
             "summary": "秒传",
             "description": "秒传",
+        }, {
+            "path": "/rapid_upload_batch",
+            "endpoint": self.rapid_upload_batch,
+            "methods": ["POST"],
+            "summary": "批量秒传",
+            "description": "批量秒传，参数items为秒传参数列表，按顺序返回每一项的结果",
+        }, {
+            "path": "/sync_paths",
+            "endpoint": self.sync_paths,
+            "methods": ["POST"],
+            "summary": "同步变更目录",
+            "description": "参数paths为发生变更的Alist目录或文件列表，合并短时间内的多次请求后只同步这些目录",
+        }, {
+            "path": "/stats",
+            "endpoint": self.stats,
+            "methods": ["GET"],
+            "summary": "运行指标",
+            "description": "各阶段耗时、接口请求数和错误率、转移记录和缓存命中率",
         }]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
@@ -192,6 +1388,38 @@ class FakeTransfer(_PluginBase):
                                     }
                                 ]
                             },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'incremental_sync',
+                                            'label': '增量同步',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'url_cache_persist',
+                                            'label': '持久化秒传缓存',
+                                        }
+                                    }
+                                ]
+                            },
                         ]
                     },
                     {
@@ -272,9 +1500,9 @@ class FakeTransfer(_PluginBase):
                                     {
                                         'component': 'VTextField',
                                         'props': {
-                                            'model': 'manual_transfer_path',
-                                            'label': '手动同步目录',
-                                            'placeholder': '单次转移目录，留空不转移'
+                                            'model': 'full_sync_hour',
+                                            'label': '全量同步间隔',
+                                            'placeholder': '增量同步时每隔多少小时执行一次全量同步，0为不执行'
                                         }
                                     }
                                 ]
@@ -289,30 +1517,229 @@ class FakeTransfer(_PluginBase):
                                     {
                                         'component': 'VTextField',
                                         'props': {
-                                            'model': 'fake_temp_path',
-                                            'label': '临时目录',
-                                            'placeholder': '临时目录'
+                                            'model': 'transfer_workers',
+                                            'label': '转移并发数',
+                                            'placeholder': '同时转移的目录数量，默认1'
                                         }
                                     }
                                 ]
                             },
-                        ]
-                    },
-
-                    {
-                        'component': 'VRow',
-                        'content': [
                             {
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
+                                    'md': 6
                                 },
                                 'content': [
                                     {
-                                        'component': 'VAlert',
+                                        'component': 'VTextField',
                                         'props': {
-                                            'type': 'info',
-                                            'variant': 'tonal',
+                                            'model': 'sync_debounce',
+                                            'label': '变更同步延迟',
+                                            'placeholder': '通过接口通知目录变更后，等待多少秒无新变更再同步，默认30'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'sync_parallel',
+                                            'label': '同时同步目录数',
+                                            'placeholder': '多个同步目录同时同步的最大数量，默认2'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'folder_order',
+                                            'label': '目录同步顺序',
+                                            'items': [
+                                                {'title': '最新修改优先', 'value': 'newest'},
+                                                {'title': '最早修改优先', 'value': 'oldest'},
+                                                {'title': '按路径', 'value': 'path'},
+                                                {'title': '按列举顺序', 'value': 'discovery'}
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'sync_time_budget',
+                                            'label': '单次同步时长',
+                                            'placeholder': '单位分钟，超过后剩余目录下次继续同步，0为不限制'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'sync_roots',
+                                            'label': '更多同步目录',
+                                            'rows': 3,
+                                            'placeholder': '每行一个：目录|同步周期|转移并发数|优先级，如 /阿里云盘/新剧|*/10 * * * *|2|10。'
+                                                           '周期留空只通过接口同步，并发数默认同转移并发数，优先级数值越大越先同步，默认0'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'manual_transfer_path',
+                                            'label': '手动同步目录',
+                                            'placeholder': '单次转移目录，留空不转移'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'fake_temp_path',
+                                            'label': '临时目录',
+                                            'placeholder': '临时目录'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'min_file_size',
+                                            'label': '最小文件大小',
+                                            'placeholder': '单位MB，小于该大小的文件不转移，0为不限制'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'duplicate_mode',
+                                            'label': '重复文件',
+                                            'items': [
+                                                {'title': '不检查', 'value': 'off'},
+                                                {'title': '只统计', 'value': 'detect'},
+                                                {'title': '跳过', 'value': 'skip'}
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'exclude_rules',
+                                            'label': '排除规则',
+                                            'rows': 3,
+                                            'placeholder': '每行一条，匹配的目录不再列举，匹配的文件不转移。'
+                                                           '默认为通配符，如 @eaDir、extras、sample*、*/BDMV/STREAM；'
+                                                           '不含/时匹配名称，含/时匹配完整路径；re:开头为正则'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'include_rules',
+                                            'label': '包含规则',
+                                            'rows': 3,
+                                            'placeholder': '每行一条，填写后只转移匹配的文件，格式同排除规则，留空转移全部媒体文件'
+                                        }
+                                    }
+                                ]
+                            },
+                        ]
+                    },
+
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VAlert',
+                                        'props': {
+                                            'type': 'info',
+                                            'variant': 'tonal',
                                             'text': '注意：以下配置属于高级设置，不清楚的请勿配置。'
                                         }
                                     }
@@ -346,8 +1773,25 @@ class FakeTransfer(_PluginBase):
                                         'component': 'VTextField',
                                         'props': {
                                             'model': 'clean_rcon',
-                                            'label': '加速文件清理周期',
-                                            'placeholder': '5位cron表达式，留空默认6小时'
+                                            'label': '加速文件全量清理周期',
+                                            'placeholder': '5位cron表达式，遍历加速目录清理遗漏的文件，留空不执行'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'alist_list_workers',
+                                            'label': '目录列举并发数',
+                                            'placeholder': '同时请求Alist列举目录的最大数量，默认4'
                                         }
                                     }
                                 ]
@@ -402,129 +1846,1091 @@ class FakeTransfer(_PluginBase):
                                         }
                                     }
                                 ]
-                            },
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'aliyun_accounts',
+                                            'label': '更多阿里云盘账号',
+                                            'rows': 2,
+                                            'placeholder': '每行一个：Alist存储ID,drive_id,加速目录id。'
+                                                           '秒传按文件sha1分配到各账号，账号被限流或失败时使用其他账号'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'connect_timeout',
+                                            'label': '连接超时',
+                                            'placeholder': '请求Alist和阿里云盘的连接超时，单位：秒，默认5'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'read_timeout',
+                                            'label': '读取超时',
+                                            'placeholder': '请求Alist和阿里云盘的读取超时，单位：秒，默认30'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'http_retries',
+                                            'label': '重试次数',
+                                            'placeholder': '连接失败或服务端错误时的重试次数，默认3'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'rapid_upload_workers',
+                                            'label': '秒传并发数',
+                                            'placeholder': '同时处理的秒传请求数量，默认4'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'url_cache_size',
+                                            'label': '秒传缓存数量',
+                                            'placeholder': '按sha1缓存已秒传的文件和下载地址，0为不缓存，默认1000'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'prefetch_max_items',
+                                            'label': '预加载数量',
+                                            'placeholder': '转移完成后为新入库的文件提前秒传，每次最多数量，0为不预加载'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'prefetch_rate',
+                                            'label': '预加载速率',
+                                            'placeholder': '预加载时每分钟最多请求阿里云盘的次数，默认20'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'aliyun_rate',
+                                            'label': '阿里云盘限速',
+                                            'placeholder': '每秒最多请求阿里云盘的次数，被限流时自动降速，播放请求优先，0为不限速，默认10'
+                                        }
+                                    }
+                                ]
+                            },
+                        ]
+                    }
+                ]
+            }
+        ], {
+            "enabled": False,
+            "notify": False,
+            "cron": '',
+            "alist_host": '',
+            "alist_token": '',
+            "alist_sync_folder": '',
+            "alist_list_workers": 4,
+            "incremental_sync": False,
+            "full_sync_hour": 24,
+            "sync_debounce": 30,
+            "transfer_workers": 1,
+            "sync_roots": '',
+            "sync_parallel": 2,
+            "folder_order": 'newest',
+            "sync_time_budget": 0,
+            "exclude_rules": '',
+            "include_rules": '',
+            "min_file_size": 0,
+            "duplicate_mode": 'off',
+
+            "alist_storage_id": 0,
+            "aliyun_drive_id": '',
+            "aliyun_parent_file_id": '',
+            "aliyun_accounts": '',
+            "clean_rcon": '',
+            "max_hour": 0,
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "http_retries": 3,
+            "rapid_upload_workers": 4,
+            "url_cache_size": 1000,
+            "url_cache_persist": False,
+            "prefetch_max_items": 0,
+            "prefetch_rate": 20,
+            "aliyun_rate": 10,
+        }
+
+    def get_page(self) -> List[dict]:
+        stats = self._get_stats()
+
+        def table(headers: List[str], rows: List[list]) -> dict:
+            return {
+                'component': 'VTable',
+                'props': {
+                    'hover': True,
+                    'density': 'compact'
+                },
+                'content': [
+                    {
+                        'component': 'thead',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [
+                                    {
+                                        'component': 'th',
+                                        'props': {
+                                            'class': 'text-start ps-4'
+                                        },
+                                        'text': header
+                                    } for header in headers
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'tbody',
+                        'content': [
+                            {
+                                'component': 'tr',
+                                'content': [
+                                    {
+                                        'component': 'td',
+                                        'text': '-' if value is None else str(value)
+                                    } for value in row
+                                ]
+                            } for row in rows
                         ]
                     }
                 ]
             }
-        ], {
-            "enabled": False,
-            "notify": False,
-            "cron": '',
-            "alist_host": '',
-            "alist_token": '',
-            "alist_sync_folder": '',
 
-            "alist_storage_id": 0,
-            "aliyun_drive_id": '',
-            "aliyun_parent_file_id": '',
-            "clean_rcon": '',
-            "max_hour": 0,
-        }
+        def card(title: str, content: dict) -> dict:
+            return {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12
+                },
+                'content': [
+                    {
+                        'component': 'VCard',
+                        'props': {
+                            'variant': 'tonal',
+                            'title': title
+                        },
+                        'content': [content]
+                    }
+                ]
+            }
 
-    def get_page(self) -> List[dict]:
-        pass
+        runs = [[run['path'], run['start'], run['elapsed'], run['folders'], run['success'], run['failed'],
+                 run['skipped'], run['files'], run['stubbed']] for run in reversed(stats['runs'])]
+        stages = [[stage, stat['count'], stat['avg_ms'], stat['p50_ms'], stat['p95_ms'], stat['max_ms']]
+                  for stage, stat in sorted(stats['stages'].items())]
+        endpoints = [[endpoint, stat['requests'], stat['retries'], stat['errors'], stat['error_rate']]
+                     for endpoint, stat in sorted(stats['endpoints'].items())]
+        caches = [[name, cache['hits'], cache['misses'], cache['hit_rate']]
+                  for name, cache in stats['caches'].items()]
+        counters = [[name, value] for name, value in sorted(stats['counters'].items())]
+        jobs = [[state, count] for state, count in stats['jobs'].items()]
+        content = stats.get('content') or {}
+        contents = [[name, content[key]] for key, name in (('files', '已索引文件'), ('duplicates', '重复文件'),
+                                                           ('shared_uploads', '共用秒传')) if key in content]
+        roots = [[root['path'], root['cron'], root['workers'], root['priority'], root['state']]
+                 for root in stats['roots']]
+        limiters = [[drive_id, limiter['rate'], limiter['max_rate'], limiter['tokens'], limiter['waiting'],
+                     limiter['throttled']] for drive_id, limiter in stats['limiters'].items()]
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    card('同步目录', table(['目录', '同步周期', '转移并发数', '优先级', '状态'], roots)),
+                    card('转移记录', table(['目录', '开始时间', '耗时(秒)', '目录数', '成功', '失败', '无需转移',
+                                         '文件数', '新文件数'], runs)),
+                    card('阶段耗时', table(['阶段', '次数', '平均(ms)', 'P50(ms)', 'P95(ms)', '最大(ms)'], stages)),
+                    card('接口请求', table(['接口', '请求数', '重试数', '错误数', '错误率'], endpoints)),
+                    card('缓存命中', table(['缓存', '命中', '未命中', '命中率'], caches)),
+                    card('阿里云盘限速', table(['drive_id', '当前速率(次/秒)', '最大速率', '剩余令牌', '等待数',
+                                               '限流次数'], limiters)),
+                    card('同步任务', table(['状态', '目录数'], jobs)),
+                    card('内容索引', table(['名称', '数量'], contents)),
+                    card('计数', table(['名称', '数量'], counters)),
+                ]
+            }
+        ]
+
+    def stats(self, _: str = Depends(verify_apikey)):
+        return schemas.Response(success=True, data=self._get_stats())
+
+    def _get_stats(self) -> dict:
+        def rate(part: int, total: int) -> Optional[float]:
+            return round(part / total, 4) if total else None
+
+        stats = self._metrics.snapshot() if self._metrics else {'stages': {}, 'counters': {}, 'runs': []}
+        endpoints = self._http.endpoint_stats() if self._http else {}
+        for stat in endpoints.values():
+            stat['error_rate'] = rate(stat['errors'], stat['requests'])
+        stats['endpoints'] = endpoints
+        counters = stats['counters']
+        stats['caches'] = {
+            'history': {
+                'hits': counters.get('history_hits', 0),
+                'misses': counters.get('history_misses', 0),
+            },
+            'stub_index': {
+                'hits': counters.get('stub_index_hits', 0),
+                'misses': counters.get('stub_index_misses', 0),
+            },
+        }
+        if self._url_cache:
+            stats['caches']['url_cache'] = {
+                'hits': self._url_cache.hits,
+                'misses': self._url_cache.misses,
+            }
+        for cache in stats['caches'].values():
+            cache['hit_rate'] = rate(cache['hits'], cache['hits'] + cache['misses'])
+        stats['limiters'] = {account.drive_id: account.limiter.stats()
+                             for account in self._accounts if account.limiter}
+        stats['jobs'] = self._jobs.counts() if self._jobs else {}
+        if self._content_index is not None:
+            stats['content'] = {
+                'files': len(self._content_index),
+                'duplicates': counters.get('files_duplicate', 0),
+                'shared_uploads': counters.get('uploads_shared', 0),
+            }
+        with self._sync_lock:
+            active, queued = set(self._sync_active), set(self._sync_queued)
+        stats['roots'] = []
+        for root in self._roots:
+            if any(self._is_subpath(path, root['path']) for path in active):
+                state = '同步中'
+            elif any(self._is_subpath(path, root['path']) for path in queued):
+                state = '等待'
+            else:
+                state = '空闲'
+            stats['roots'].append(dict(root, state=state))
+        return stats
 
     def stop_service(self):
         """
         退出插件
         """
-        pass
+        if self._prefetch_stop:
+            self._prefetch_stop.set()
+        if self._sync_stop:
+            # 正在执行的同步在当前目录转移完成后停止，下次同步时继续
+            self._sync_stop.set()
+            self._sync_stop = None
+        with self._sync_lock:
+            self._sync_queued = {}
+            self._debounce_paths = {}
+            if self._debounce_timer:
+                self._debounce_timer.cancel()
+                self._debounce_timer = None
+            if self._sync_executor:
+                self._sync_executor.shutdown(wait=False, cancel_futures=True)
+                self._sync_executor = None
+        if self._upload_executor:
+            self._upload_executor.shutdown(wait=False)
+            self._upload_executor = None
+        if self._url_cache and self._url_cache_persist:
+            self.chain.save_cache(self._url_cache.dumps(), self._url_cache_file_name)
+        for account in self._accounts:
+            self.chain.save_cache(account.expiry.dumps(), account.cache_name(self._expiry_file_name))
+            account.close()
+        self._save_jobs(force=True)
+        with self._stub_index_lock:
+            for _, index in self._stub_indexes.values():
+                index.close()
+            self._stub_indexes = {}
+        if self._http:
+            self._http.close()
+
+    def _load_accounts(self) -> List[AliyunAccount]:
+        """
+        原有的单账号配置作为第一个账号，其余账号每行一个：Alist存储ID,drive_id,parent_file_id
+        """
+        accounts = []
+        if self._aliyun_drive_id and self._aliyun_parent_file_id:
+            accounts.append(AliyunAccount(self._alist_storage_id, self._aliyun_drive_id,
+                                          self._aliyun_parent_file_id, primary=True))
+        for line in self._aliyun_accounts.splitlines():
+            if not line.strip() or line.strip().startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split(',')]
+            if len(fields) != 3 or not all(fields):
+                logger.error(f'阿里云盘账号配置错误：{line}')
+                continue
+            if any(account.drive_id == fields[1] for account in accounts):
+                continue
+            accounts.append(AliyunAccount(*fields))
 
-    def _load_token(self):
-        content = self.chain.load_cache(self._cache_file_name)
-        token = None
+        for account in accounts:
+            # 每个账号使用独立的限速器，0为不限速
+            account.limiter = RateLimiter(self._aliyun_rate) if self._aliyun_rate > 0 else None
+            content = self.chain.load_cache(account.cache_name(self._expiry_file_name))
+            if content:
+                try:
+                    account.expiry.loads(content)
+                except Exception as e:
+                    logger.error(f'读取账号{account.drive_id}的过期索引失败：{e}')
+            account.refresh_token = self._get_refresh_token(account)
+            account.token = AccessToken(refresh=partial(self._refresh_access_token, account),
+                                        load=partial(self._load_saved_token, account),
+                                        save=partial(self._save_token, account))
+        return accounts
+
+    @staticmethod
+    def _load_token(account: AliyunAccount):
+        return account.token.get() if account.token else None
+
+    def _load_saved_token(self, account: AliyunAccount):
+        content = self.chain.load_cache(account.cache_name(self._cache_file_name))
         if content:
-            tmp = json.loads(content)
-            expires_in = tmp['expires_in']
-            if int(time.time()) < expires_in:
-                token = tmp['access_token']
-
-        if not token:
-            if not self._refresh_token:
-                self._refresh_token = self._get_refresh_token()
-            resp = self._aliyun_access_token()
-            resp['expires_in'] = resp['expires_in'] + int(time.time())
-            token = resp['access_token']
-            self._refresh_token = resp['refresh_token']
-            self.chain.save_cache(json.dumps(resp), self._cache_file_name)
-        return token
+            return json.loads(content)
+        return None
+
+    def _save_token(self, account: AliyunAccount, data: dict):
+        self.chain.save_cache(json.dumps(data), account.cache_name(self._cache_file_name))
+
+    def _refresh_access_token(self, account: AliyunAccount):
+        if not account.refresh_token:
+            account.refresh_token = self._get_refresh_token(account)
+        resp = self._aliyun_access_token(account)
+        if not resp:
+            return None
+        resp['expires_in'] = resp['expires_in'] + int(time.time())
+        account.refresh_token = resp['refresh_token']
+        return resp
 
     async def rapid_upload(self, request: Request, _: str = Depends(verify_apikey)):
         data = await request.json()
+        if not self._upload_executor:
+            return schemas.Response(success=False, message="插件未配置")
+
+        loop = asyncio.get_running_loop()
+        with self._metrics.timer('rapid_upload'):
+            dl_url, message = await loop.run_in_executor(self._upload_executor, self._resolve_rapid_upload, data)
+        return schemas.Response(success=True if dl_url else False, message=message, data={
+            "url": dl_url
+        })
+
+    async def rapid_upload_batch(self, request: Request, _: str = Depends(verify_apikey)):
+        data = await request.json()
+        if not self._upload_executor:
+            return schemas.Response(success=False, message="插件未配置")
+        items = data.get("items")
+        if not isinstance(items, list) or not items:
+            return schemas.Response(success=False, message="参数错误")
+        if len(items) > self._rapid_upload_batch_max:
+            return schemas.Response(success=False, message=f"单次最多{self._rapid_upload_batch_max}项")
+
+        loop = asyncio.get_running_loop()
+        # 单个批量请求最多占用一半的秒传线程，保证单独的播放请求能及时处理
+        semaphore = asyncio.Semaphore(max(self._rapid_upload_workers // 2, 1))
+
+        async def resolve(item):
+            if not isinstance(item, dict):
+                return {"success": False, "message": "参数错误", "url": None}
+            async with semaphore:
+                try:
+                    dl_url, message = await loop.run_in_executor(self._upload_executor,
+                                                                 self._resolve_rapid_upload, item)
+                except Exception as e:
+                    logger.error(f'秒传失败：{e}')
+                    dl_url, message = None, str(e)
+            return {"success": True if dl_url else False, "message": message, "url": dl_url}
+
+        results = await asyncio.gather(*[resolve(item) for item in items])
+        return schemas.Response(success=any(r["success"] for r in results), data={
+            "items": results
+        })
 
+    def _resolve_rapid_upload(self, data: dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        解析秒传参数并获取下载地址，返回 (下载地址, 错误信息)
+        """
         file_name = data.get("file_name", None)
         size = int(data.get("size", 0))
         sha1 = data.get("sha1", None)
         abs_path = data.get("abs_path", None)
 
         if (not size or not sha1) and (not abs_path or not os.path.exists(abs_path)):
-            return schemas.Response(success=False, message="参数错误")
+            return None, "参数错误"
 
         if abs_path:
             file_name = os.path.basename(abs_path)
-            with open(abs_path, 'rb') as f:
-                data_load = pickle.load(f)
-                size = data_load.get('size', 0)
-                sha1 = data_load.get('sha1', '')
+            data_load = self._load_stub(abs_path)
+            size = data_load.get('size', 0)
+            sha1 = data_load.get('sha1', '')
 
         if not file_name:
             file_name = datetime.now().strftime('%Y%m%d%H%M%S%f') + '.mkv'
 
-        dl_url = self._aliyun_download_url(file_name, size, sha1)
-        return schemas.Response(success=True if dl_url else False, data={
-            "url": dl_url
-        })
+        return self._aliyun_download_url(file_name, size, sha1), None
+
+    def _get_temp_path(self) -> Path:
+        if not self._fake_temp_path:
+            return settings.TEMP_PATH / 'fake'
+        return Path(self._fake_temp_path)
+
+    def _load_stub(self, abs_path) -> dict:
+        """
+        读取虚拟文件信息，优先从索引中查询
+        """
+        index_dir = self._get_temp_path() / self._index_dir_name
+        if index_dir.exists():
+            # 最近更新的索引优先
+            index_files = sorted(index_dir.glob('*.idx'), key=lambda file: file.stat().st_mtime, reverse=True)
+            for index_file in index_files:
+                stub = self._lookup_stub_index(index_file, abs_path)
+                if stub:
+                    self._metrics.incr('stub_index_hits')
+                    return stub
+        self._metrics.incr('stub_index_misses')
+        return FakeStub.load(abs_path)
+
+    def _lookup_stub_index(self, index_file: Path, abs_path) -> Optional[dict]:
+        """
+        在索引文件中查询虚拟文件，索引更新后重新映射，查询在锁内完成以免读取已关闭的映射
+        """
+        with self._stub_index_lock:
+            try:
+                mtime = index_file.stat().st_mtime
+                cached = self._stub_indexes.get(str(index_file))
+                if cached and cached[0] == mtime:
+                    return cached[1].get(abs_path)
+                index = StubIndex(index_file)
+                if cached:
+                    cached[1].close()
+                self._stub_indexes[str(index_file)] = (mtime, index)
+                return index.get(abs_path)
+            except Exception as e:
+                logger.error(f'读取索引{index_file}失败：{e}')
+                return None
+
+    def _update_stub_index(self, root: str, entries: Dict[str, Tuple[int, Optional[str], str]]):
+        """
+        将本次转移的虚拟文件合并到同步目录的索引中，每个同步目录一个索引
+        :param root: 同步目录，子目录的同步同样写入所属同步目录的索引
+        :param entries: {媒体库中的虚拟文件路径: (大小, sha1, 源路径)}
+        """
+        index_dir = self._get_temp_path() / self._index_dir_name
+        index_file = index_dir / f'{hashlib.md5(root.encode("utf-8")).hexdigest()}.idx'
+        try:
+            index_dir.mkdir(parents=True, exist_ok=True)
+            # 同一同步目录下的多个子目录同时同步时依次合并
+            with self._stub_index_write_lock:
+                merged = {}
+                if index_file.exists():
+                    index = StubIndex(index_file)
+                    merged = index.items()
+                    index.close()
+                for dest, (size, sha1, src) in entries.items():
+                    merged[StubIndex.key(dest)] = (size, _sha1_to_bytes(sha1), src)
+                StubIndex.write(index_file, merged)
+            logger.info(f'更新目录{root}的虚拟文件索引，共{len(merged)}条')
+        except Exception as e:
+            logger.error(f'更新目录{root}的虚拟文件索引失败：{e}')
+
+    def _start_prefetch(self, entries: Dict[str, Tuple[int, Optional[str], str]]):
+        """
+        在后台为新入库的文件提前秒传并缓存下载地址
+        :param entries: {媒体库中的虚拟文件路径: (大小, sha1, 源路径)}
+        """
+        if not self._prefetch_max_items or not self._url_cache:
+            return
+        if self._prefetch_thread and self._prefetch_thread.is_alive():
+            logger.info('上一次预加载尚未完成，跳过本次预加载')
+            return
+        # 优先预加载最后入库的文件
+        items = [(os.path.basename(dest), size, sha1) for dest, (size, sha1, _) in entries.items() if sha1]
+        items = items[-self._prefetch_max_items:]
+        if not items:
+            return
+        self._prefetch_stop = threading.Event()
+        self._prefetch_thread = threading.Thread(target=self._prefetch_urls, args=(items, self._prefetch_stop),
+                                                 name='rapid-upload-prefetch', daemon=True)
+        self._prefetch_thread.start()
+
+    def _prefetch_urls(self, items: List[Tuple[str, int, str]], stop_event: threading.Event):
+        """
+        按速率限制依次秒传，每个文件最多请求两次（创建文件和获取下载地址）
+        """
+        interval = 60 / max(self._prefetch_rate, 1) * 2
+        success = 0
+        logger.info(f'开始预加载{len(items)}个文件的下载地址')
+        for file_name, size, sha1 in items:
+            if stop_event.is_set():
+                break
+            try:
+                if self._aliyun_download_url(file_name, size, sha1, RateLimiter.PREFETCH):
+                    success += 1
+            except Exception as e:
+                logger.error(f'预加载{file_name}失败：{e}')
+            stop_event.wait(interval)
+        logger.info(f'预加载完成，成功{success}个')
+
+    def _load_roots(self) -> List[Dict[str, Any]]:
+        """
+        原有的同步目录作为第一个同步目录，其余每行一个：目录|同步周期|转移并发数|优先级，后三项可省略
+        """
+        roots = []
+        if self._alist_sync_folder:
+            roots.append({'path': self._alist_sync_folder, 'cron': self._sync_cron,
+                          'workers': self._transfer_workers, 'priority': 0})
+        for line in self._sync_roots.splitlines():
+            if not line.strip() or line.strip().startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split('|')] + ['', '', '']
+            path = fields[0].rstrip('/') or '/'
+            if any(root['path'] == path for root in roots):
+                continue
+            try:
+                if fields[1]:
+                    CronTrigger.from_crontab(fields[1])
+                roots.append({'path': path, 'cron': fields[1],
+                              'workers': int(fields[2] or self._transfer_workers),
+                              'priority': int(fields[3] or 0)})
+            except ValueError as e:
+                logger.error(f'同步目录配置错误：{line}，{e}')
+        return roots
+
+    def _root_for(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        路径所属的同步目录，有多个时取最深的一个
+        """
+        roots = [root for root in self._roots if self._is_subpath(path, root['path'])]
+        return max(roots, key=lambda root: len(root['path'])) if roots else None
 
-    def _fake_transfer(self, path=None):
-        temp_path = self._fake_temp_path
-        if not temp_path:
-            temp_path = settings.TEMP_PATH / 'fake'
-        else:
-            temp_path = Path(self._fake_temp_path)
+    @staticmethod
+    def _is_subpath(path: str, parent: str) -> bool:
+        return path == parent or path.startswith(parent.rstrip('/') + '/')
 
-        logger.info(f'开始执行目录{path if path else self._alist_sync_folder}转移任务...')
+    def _request_sync(self, path: str = None, full: bool = False, cron: bool = False) -> bool:
+        """
+        提交同步请求：定时触发时如该目录正在同步或等待同步则跳过，同一目录的请求在执行前合并为一次
+        :return: 是否已提交或合并
+        """
+        path = path or (self._roots[0]['path'] if self._roots else None)
         if not path:
-            path = self._alist_sync_folder
+            return False
+        with self._sync_lock:
+            busy = next((p for p in [*self._sync_active, *self._sync_queued]
+                         if self._is_subpath(path, p) or self._is_subpath(p, path)), None)
+            if cron and busy:
+                logger.info(f'目录{busy}{"正在同步" if busy in self._sync_active else "等待同步"}，'
+                            f'跳过目录{path}的定时同步')
+                return False
+            if path in self._sync_queued:
+                self._sync_queued[path] = self._sync_queued[path] or full
+                logger.info(f'目录{path}已在等待同步，合并本次请求')
+                return True
+            parent = next((p for p in self._sync_queued if self._is_subpath(path, p)), None)
+            if parent and not full:
+                logger.info(f'上级目录{parent}已在等待同步，合并目录{path}的请求')
+                return True
+            if not self._sync_executor:
+                self._sync_executor = ThreadPoolExecutor(max_workers=max(self._sync_parallel, 1),
+                                                         thread_name_prefix='fake-sync')
+            self._sync_queued[path] = full
+            self._dispatch_sync()
+            return True
+
+    def _dispatch_sync(self):
+        """
+        按优先级启动等待中的目录，直到达到同时同步的数量，与正在同步的目录有包含关系的暂不启动，需持有_sync_lock
+        """
+        while self._sync_executor and len(self._sync_active) < max(self._sync_parallel, 1):
+            ready = [path for path in self._sync_queued
+                     if not any(self._is_subpath(path, p) or self._is_subpath(p, path) for p in self._sync_active)]
+            if not ready:
+                return
+            # 优先级相同时先请求的先同步
+            path = max(ready, key=lambda p: (self._root_for(p) or {}).get('priority', 0))
+            full = self._sync_queued.pop(path)
+            self._sync_active.add(path)
+            self._sync_executor.submit(self._run_sync, path, full, self._sync_stop)
 
-        file_list = self._alist_list(path)
-        if not file_list:
+    async def sync_paths(self, request: Request, _: str = Depends(verify_apikey)):
+        data = await request.json()
+        paths = data.get("paths")
+        if isinstance(paths, str):
+            paths = [paths]
+        if not isinstance(paths, list) or not paths:
+            return schemas.Response(success=False, message="参数错误")
+        if not self._enabled or not self._roots:
+            return schemas.Response(success=False, message="插件未配置")
+        accepted, rejected = self._queue_sync_paths(paths)
+        return schemas.Response(success=bool(accepted),
+                                message=f"{len(rejected)}个路径不在同步目录中" if rejected else None,
+                                data={"accepted": accepted, "rejected": rejected})
+
+    def _queue_sync_paths(self, paths: List[str]) -> Tuple[List[str], List[Any]]:
+        """
+        将变更路径加入等待同步的目录：带扩展名的路径（媒体、字幕、nfo等文件）取所在目录，已有上级目录等待时合并到上级目录，
+        每次变更重新等待sync_debounce秒，但最长不超过5倍，返回 (接受的目录, 拒绝的路径)
+        """
+        accepted, rejected = [], []
+        for raw in paths:
+            if not isinstance(raw, str) or not raw.strip():
+                rejected.append(raw)
+                continue
+            path = posixpath.normpath('/' + raw.strip().strip('/'))
+            # 文件可能已被删除，无法确认类型，带扩展名的都按文件处理，名称带点的目录同步其上级目录
+            if posixpath.splitext(path)[-1] and not any(root['path'] == path for root in self._roots):
+                path = posixpath.dirname(path)
+            if not self._root_for(path):
+                rejected.append(raw)
+                continue
+            if self._exclude and self._exclude.match(path, posixpath.basename(path)):
+                rejected.append(raw)
+                continue
+            accepted.append(path)
+
+        now = time.time()
+        with self._sync_lock:
+            for path in accepted:
+                parent = next((p for p in self._debounce_paths if path == p or path.startswith(p + '/')), path)
+                first, _ = self._debounce_paths.get(parent, (now, now))
+                for child in [p for p in self._debounce_paths if p.startswith(path + '/')]:
+                    first = min(first, self._debounce_paths.pop(child)[0])
+                self._debounce_paths[parent] = (first, min(now + self._sync_debounce,
+                                                           first + self._sync_debounce * 5))
+            self._schedule_sync_paths()
+        if accepted:
+            logger.info(f'收到目录变更：{", ".join(accepted)}，{self._sync_debounce}秒后同步')
+        return accepted, rejected
+
+    def _schedule_sync_paths(self):
+        """
+        按最早的同步时间设置定时器，需持有_sync_lock
+        """
+        if self._debounce_timer:
+            self._debounce_timer.cancel()
+            self._debounce_timer = None
+        if not self._debounce_paths:
             return
+        delay = max(min(due for _, due in self._debounce_paths.values()) - time.time(), 0)
+        self._debounce_timer = threading.Timer(delay, self._flush_sync_paths)
+        self._debounce_timer.daemon = True
+        self._debounce_timer.start()
+
+    def _flush_sync_paths(self):
+        now = time.time()
+        with self._sync_lock:
+            due = [path for path, (_, at) in self._debounce_paths.items() if at <= now]
+            for path in due:
+                self._debounce_paths.pop(path)
+            self._schedule_sync_paths()
+        for path in due:
+            self._request_sync(path)
+
+    def _run_sync(self, path: str, full: bool, stop_event: threading.Event):
+        try:
+            self._fake_transfer(path, full, stop_event)
+        except Exception as e:
+            logger.error(f'目录{path}同步出错：{e}')
+        finally:
+            with self._sync_lock:
+                self._sync_active.discard(path)
+                self._dispatch_sync()
+
+    def _fake_transfer(self, path=None, full=False, stop_event: threading.Event = None):
+        temp_path = self._get_temp_path()
+
+        if not path:
+            path = self._roots[0]['path'] if self._roots else self._alist_sync_folder
+        logger.info(f'开始执行目录{path}转移任务...')
+        root = self._root_for(path) or {}
+
+        snapshot = None
+        incremental = False
+        if self._incremental_sync:
+            snapshot = self._load_snapshot()
+            last_full = snapshot['full_sync'].get(path, 0)
+            # 手动转移或到达全量同步间隔时全量列举，但同样刷新快照
+            incremental = not full and not (
+                    self._full_sync_hour and time.time() - last_full >= self._full_sync_hour * 3600)
+            logger.info(f'目录{path}执行{"增量" if incremental else "全量"}同步')
+
+        start_time = time.time()
+        stubbed = self._metrics.counter('files_stubbed')
+
+        # 一次性加载同步目录对应临时目录下已转移过的文件
+        with self._metrics.timer('history_load'):
+            transferred = self._load_transferred(temp_path.joinpath(path[1:]))
+
+        # 上一次同步中断时，先转移已列举的目录，再从未列举的目录继续遍历
+        jobs = self._jobs or TransferJobs()
+        ready = []
+        if jobs.start(path):
+            order = self._folder_order_key()
+            ready = sorted(jobs.ready(path), key=lambda item: self._folder_key(order, *item))
+            logger.info(f'目录{path}继续上一次同步，待转移目录{len(ready)}个')
+        starts = jobs.pending(path)
+        walk = self._alist_walk(path, snapshot=snapshot['dirs'] if snapshot else None, incremental=incremental,
+                                starts=starts, jobs=jobs, content_index=self._content_index)
+
+        summary = {'success': 0, 'failed': 0, 'skipped': 0, 'files': 0}
+        failed_folders = []
+        # 转移成功的虚拟文件，用于更新索引
+        index_entries = {}
+
+        def collect(future):
+            folder, files = futures.pop(future)
+            state = future.result()
+            if state is None:
+                summary['skipped'] += 1
+            elif state:
+                summary['success'] += 1
+            else:
+                summary['failed'] += 1
+                failed_folders.append(folder)
+            if state is False:
+                if not jobs.fail(folder, path, files):
+                    # 不再使快照失效，目录有变化或全量同步时再重新转移
+                    failed_folders.remove(folder)
+                    logger.error(f'目录{folder}多次转移失败，不再重试')
+            else:
+                jobs.set(folder, TransferJobs.TRANSFERRED)
+            self._save_jobs()
+
+        # 多个目录并发转移，等待转移的目录数量不超过并发数的两倍，避免一次性堆积全部目录
+        workers = max(root.get('workers') or self._transfer_workers or 1, 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fake-transfer') as executor:
+            futures = {}
+            try:
+                for file_root, files in itertools.chain(ready, walk):
+                    if stop_event and stop_event.is_set():
+                        logger.warn(f'插件已停止，目录{path}的同步下次继续')
+                        break
+                    if self._sync_time_budget and time.time() - start_time > self._sync_time_budget * 60:
+                        logger.warn(f'目录{path}同步超过{self._sync_time_budget}分钟，剩余目录下次继续')
+                        break
+                    # 转移失败的目录等到重试时间后再转移，快照保持失效以便之后重新列举
+                    if jobs.deferred(file_root, time.time()):
+                        failed_folders.append(file_root)
+                        continue
+                    summary['files'] += len(files)
+                    # 多个文件时按目录整体转移，会包含子目录，不与正在转移的上级或下级目录同时转移
+                    while True:
+                        overlap = [future for future, (folder, _) in futures.items()
+                                   if self._is_subpath(folder, file_root) or self._is_subpath(file_root, folder)]
+                        if not overlap:
+                            break
+                        done, _ = wait(overlap, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+                    future = executor.submit(self._transfer_folder, temp_path, file_root, files, transferred,
+                                             index_entries, jobs)
+                    futures[future] = (file_root, files)
+                    if len(futures) >= workers * 2:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+            finally:
+                # 提前结束时通知遍历线程停止
+                walk.close()
+            for future in list(futures):
+                collect(future)
+
+        finished = jobs.finish(path)
+        if not finished:
+            logger.warn(f'目录{path}未同步完成，下次同步时继续')
+        self._save_jobs(force=True)
+        self._save_content_index()
+        logger.info(f'目录{path}转移完成，成功{summary["success"]}个，失败{summary["failed"]}个，'
+                    f'无需转移{summary["skipped"]}个，耗时{int(time.time() - start_time)}秒')
+        self._metrics.add_run({
+            'path': path,
+            'start': datetime.fromtimestamp(start_time).strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed': int(time.time() - start_time),
+            'folders': summary['success'] + summary['failed'] + summary['skipped'],
+            'success': summary['success'],
+            'failed': summary['failed'],
+            'skipped': summary['skipped'],
+            'files': summary['files'],
+            'stubbed': self._metrics.counter('files_stubbed') - stubbed,
+        })
+        if index_entries:
+            self._update_stub_index(root.get('path') or path, index_entries)
+            self._start_prefetch(index_entries)
 
-        for file_root, files in file_list.items():
+        if snapshot:
+            # 转移失败的目录下次重新列举
+            for folder in failed_folders:
+                self._invalidate_snapshot(snapshot['dirs'], folder)
+            # 未同步完成时不计入全量同步时间
+            self._save_snapshot(path, snapshot, full_sync=not incremental and finished)
+        return summary
+
+    def _transfer_folder(self, temp_path: Path, file_root: str, files: List[dict], transferred: Optional[set],
+                         index_entries: dict = None, jobs: TransferJobs = None) -> Optional[bool]:
+        """
+        为目录下未转移的文件生成虚拟文件并转移
+        :param index_entries: 转移成功后写入 {媒体库中的虚拟文件路径: (大小, sha1, 源路径)}
+        :param jobs: 生成虚拟文件后记录目录状态
+        :return: 无需转移时返回None，否则返回是否转移成功
+        """
+        try:
             file_temp_dir = temp_path.joinpath(file_root[1:])
-            if not os.path.exists(file_temp_dir):
-                os.makedirs(file_temp_dir)
+            # 多个转移线程可能同时创建相同的上级目录
+            os.makedirs(file_temp_dir, exist_ok=True)
 
             file_to_tr = []
+            stubs = {}
             transfer_path = file_temp_dir
             for file in files:
                 file_path = file_temp_dir / file['name']
-                ths = self.transfer_his.get_by_src(str(file_path))
+                if transferred is not None:
+                    ths = str(file_path) in transferred
+                else:
+                    ths = self.transfer_his.get_by_src(str(file_path))
+                self._metrics.incr('history_hits' if ths else 'history_misses')
                 if not ths:
                     file_to_tr.append(file_path)
-                    with open(file_path, 'wb') as f:
-                        data = {
-                            'src': file['path'],
-                            'size': file['size'],
-                            'sha1': file['sha1'],
-                        }
-                        pickle.dump(data, f)
+                    with self._metrics.timer('stub_write'):
+                        FakeStub.dump(file_path, src=file['path'], size=file['size'], sha1=file['sha1'])
+                    stubs[str(file_path)] = (file['size'], file['sha1'], file['path'])
+            self._metrics.incr('files_stubbed', len(file_to_tr))
+            if jobs:
+                jobs.set(file_root, TransferJobs.STUBBED)
             if file_to_tr:
                 if len(file_to_tr) == 1:
                     transfer_path = file_to_tr[0]
             else:
                 logger.warn(f'目录{transfer_path}下的文件，没有需要转移的文件')
-                continue
+                self._confirm_content(file_root, files)
+                return None
             logger.info(f'开始转移目录/文件：{transfer_path}')
-            state, errmsg = self._transfer.do_transfer(path=transfer_path, transfer_type=self._transfer_type)
+            with self._metrics.timer('do_transfer'):
+                state, errmsg = self._get_transfer_chain().do_transfer(path=transfer_path,
+                                                                       transfer_type=self._transfer_type)
 
             if not state:
                 logger.error(f'转移文件：{transfer_path}，失败：{errmsg}')
+                return False
+            if transferred is not None:
+                transferred.update(str(f) for f in file_to_tr)
+            if index_entries is not None:
+                for src, dest in self._load_transfer_dests(list(stubs)).items():
+                    index_entries[dest] = stubs[src]
+            self._confirm_content(file_root, files)
+            return True
+        except Exception as e:
+            logger.error(f'转移目录{file_root}出错：{e}')
+            return False
 
-    def _alist_list(self, path, pwd=None):
-        if not self._alist_host:
+    def _confirm_content(self, file_root: str, files: List[dict]):
+        """
+        目录下的文件已转移，登记到内容索引，之后其他目录中的相同文件才按重复文件处理
+        """
+        if self._content_index is None:
+            return
+        for file in files:
+            self._content_index.confirm(file['sha1'], file['size'], f'{file_root}/{file["name"]}')
+
+    def _save_jobs(self, force: bool = False):
+        """
+        保存同步任务，未强制保存时按间隔保存
+        """
+        if not self._jobs:
+            return
+        if not force and time.time() - self._jobs_saved_at < self._jobs_checkpoint_interval:
+            return
+        self._jobs_saved_at = time.time()
+        # 多个目录同时同步时依次写入
+        with self._jobs_save_lock:
+            content = self._jobs.dumps()
+            if content:
+                self.chain.save_cache(content, self._jobs_file_name)
+
+    def _save_content_index(self):
+        if self._content_index is None:
+            return
+        with self._content_save_lock:
+            content = self._content_index.dumps()
+            if content:
+                self.chain.save_cache(content, self._content_file_name)
+
+    def _get_transfer_chain(self) -> TransferChain:
+        chain = getattr(self._transfer_local, 'chain', None)
+        if not chain:
+            chain = TransferChain()
+            self._transfer_local.chain = chain
+        return chain
+
+    @staticmethod
+    def _load_transferred(prefix: Path):
+        """
+        批量查询源路径在指定目录下的转移记录，返回源路径集合，查询失败时返回None
+        """
+        db = SessionFactory()
+        try:
+            rows = db.query(TransferHistory.src).filter(TransferHistory.src.like(f'{prefix}%')).all()
+            return {row[0] for row in rows}
+        except Exception as e:
+            logger.error(f'批量查询转移记录失败：{e}')
+            return None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load_transfer_dests(srcs: List[str]) -> Dict[str, str]:
+        """
+        批量查询转移记录的目的路径，返回 {源路径: 目的路径}
+        """
+        if not srcs:
             return {}
+        db = SessionFactory()
+        try:
+            rows = db.query(TransferHistory.src, TransferHistory.dest) \
+                .filter(TransferHistory.src.in_(srcs)).all()
+            return {row[0]: row[1] for row in rows if row[1]}
+        except Exception as e:
+            logger.error(f'批量查询转移记录失败：{e}')
+            return {}
+        finally:
+            db.close()
+
+    def _load_snapshot(self):
+        """
+        读取目录快照：{"dirs": {目录: {"modified": 修改时间}}, "full_sync": {同步目录: 时间戳}}
+        """
+        content = self.chain.load_cache(self._snapshot_file_name)
+        if content:
+            try:
+                return json.loads(content)
+            except Exception as e:
+                logger.error(f'读取目录快照失败：{e}')
+        return {'dirs': {}, 'full_sync': {}}
+
+    def _save_snapshot(self, path: str, snapshot: dict, full_sync: bool):
+        """
+        只保存本次同步目录下的快照，合并其他目录同时进行的同步结果
+        """
+        with self._snapshot_lock:
+            current = self._load_snapshot()
+            dirs = {folder: value for folder, value in current['dirs'].items() if not self._is_subpath(folder, path)}
+            dirs.update({folder: value for folder, value in snapshot['dirs'].items()
+                         if self._is_subpath(folder, path)})
+            current['dirs'] = dirs
+            if full_sync:
+                current['full_sync'][path] = int(time.time())
+            self.chain.save_cache(json.dumps(current), self._snapshot_file_name)
+
+    @staticmethod
+    def _invalidate_snapshot(snapshot, folder):
+        """
+        移除目录及其所有上级目录的快照，保证下次同步时重新列举到该目录
+        """
+        while folder and folder != '/':
+            snapshot.pop(folder, None)
+            folder = os.path.dirname(folder)
+
+    def _alist_list(self, path, pwd=None, snapshot=None, incremental=False):
+        """
+        列举Alist目录下的媒体文件，返回 {目录: [文件信息]}
+        """
+        return dict(self._alist_walk(path, pwd=pwd, snapshot=snapshot, incremental=incremental))
+
+    def _alist_walk(self, path, pwd=None, snapshot=None, incremental=False, starts: List[str] = None,
+                    jobs: TransferJobs = None, content_index: ContentIndex = None):
+        """
+        遍历Alist目录，每列举完成一个包含媒体文件的目录即返回 (目录, [文件信息])
+        :param snapshot: 目录快照，列举成功的目录会更新到快照中
+        :param incremental: 是否跳过修改时间与快照一致的子目录，否则仅对有变化的目录请求刷新
+        :param starts: 从这些目录开始遍历，默认为path
+        :param jobs: 记录各目录的列举状态，用于中断后继续遍历
+        :param content_index: 按sha1和大小识别其他目录中已转移过的相同文件
+        按folder_order排序：优先列举排在前面的子目录，已列举完成等待转移的目录也按该顺序返回
+        """
+        if not self._alist_host:
+            return
 
         url = f'{self._alist_host}/api/fs/list'
         headers = {'Content-Type': 'application/json'}
@@ -535,50 +2941,218 @@ class FakeTransfer(_PluginBase):
         if pwd:
             headers.update({'Cookie': f'browser-password={pwd}'})
 
-        def list_dir(alist_path):
-            data = {
-                "path": alist_path,
-                "password": '',
-                "page": 1,
-                "per_page": 0,
-                "refresh": bool(self._alist_token)
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(data))
-            return response.json()
+        def list_dir(alist_path, refresh):
+            content = []
+            page = 1
+            while True:
+                data = {
+                    "path": alist_path,
+                    "password": '',
+                    "page": page,
+                    "per_page": self._alist_per_page,
+                    # 仅第一页请求刷新，后续页使用刷新后的缓存
+                    "refresh": refresh and page == 1
+                }
+                response = self._http.post(url, headers=headers, data=json.dumps(data))
+                ret = response.json()
+                if ret.get('code') != 200:
+                    message = ret.get('message') or ''
+                    if 'not found' in message.lower():
+                        raise FileNotFoundError(message)
+                    raise Exception(message)
+                items = ret['data']['content'] or []
+                content.extend(items)
+                if not items or len(content) >= (ret['data'].get('total') or 0):
+                    return content
+                page += 1
 
-        folders_with_files = dict()
+        order = self._folder_order_key()
+        seq = itertools.count()
+        # 已列举完成的目录，按 (是否结束, 排序值, 序号, 目录) 排序，None表示遍历结束
+        folders = queue.PriorityQueue(maxsize=self._alist_walk_buffer)
+        stop_event = threading.Event()
 
-        def list_all(root):
-            q = queue.Queue()
-            q.put(root)
-            while not q.empty():
-                cur_path = q.get()
-                data = list_dir(cur_path)
-                if not data['data']['content']:
+        def emit(item, key=0):
+            entry = (0, key, next(seq), item) if item else (1, 0, next(seq), None)
+            while not stop_event.is_set():
+                try:
+                    folders.put(entry, timeout=1)
                     return
-                for item in data['data']['content']:
-                    if item['is_dir']:
-                        q.put(f'{cur_path}/{item["name"]}')
-                    else:
-                        if os.path.splitext(item['name'])[-1].lower() not in settings.RMT_MEDIAEXT:
+                except queue.Full:
+                    continue
+
+        # 从同步目录开始全量列举时，列举完成后清理内容索引中已不存在的文件
+        prune = content_index is not None and not incremental and (starts is None or starts == [path])
+        if starts is None:
+            starts = [path]
+
+        def walk():
+            # 目录在上级目录中的修改时间
+            modified = {start: None for start in starts}
+            # 等待列举的目录 (排序值, 序号, 目录, 是否刷新)
+            pending = [(order(start, 0), next(seq), start, bool(self._alist_token)) for start in starts]
+            heapq.heapify(pending)
+            # 目录并发列举，线程池大小即同时请求Alist的最大数量
+            workers = max(self._alist_list_workers or 1, 1)
+            # 本次列举到的源路径
+            seen = set()
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='alist-list') as executor:
+                futures = {}
+                failed = False
+
+                def submit():
+                    while pending and len(futures) < workers and not stop_event.is_set():
+                        _, _, sub_path, refresh = heapq.heappop(pending)
+                        futures[executor.submit(list_dir, sub_path, refresh)] = sub_path
+
+                submit()
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        cur_path = futures.pop(future)
+                        try:
+                            content = future.result()
+                        except FileNotFoundError as e:
+                            # 目录已被删除或改名，不再重试
+                            logger.warn(f'目录{cur_path}不存在：{e}，跳过')
+                            modified.pop(cur_path, None)
+                            if jobs:
+                                jobs.list_failed(cur_path, path, missing=True)
+                            if snapshot is not None:
+                                snapshot.pop(cur_path, None)
                             continue
-                        hash_info = item.get('hash_info') or {}
-                        file_info = {
-                            'name': item['name'],
-                            'size': item['size'],
-                            'sha1': hash_info.get('sha1', None),
-                            'path': f'{root}/{item["name"]}',
-                        }
-                        if cur_path in folders_with_files:
-                            folders_with_files[cur_path].append(file_info)
-                        else:
-                            folders_with_files[cur_path] = [file_info]
-
-        list_all(path)
-        return folders_with_files
+                        except Exception as e:
+                            # 只跳过该目录，其他目录继续列举，该目录下次同步时重试
+                            failed = True
+                            if jobs and not jobs.list_failed(cur_path, path):
+                                logger.error(f'列举目录{cur_path}失败：{e}，多次失败不再重试')
+                            else:
+                                logger.error(f'列举目录{cur_path}失败：{e}，下次同步时重试')
+                            if snapshot is not None:
+                                self._invalidate_snapshot(snapshot, cur_path)
+                            continue
+                        if stop_event.is_set():
+                            # 子目录不再列举，需保证下次同步时重新列举
+                            if snapshot is not None:
+                                self._invalidate_snapshot(snapshot, cur_path)
+                            continue
+                        dir_modified = modified.pop(cur_path, None)
+                        if snapshot is not None:
+                            snapshot[cur_path] = {'modified': dir_modified}
+                        files = []
+                        for item in content:
+                            if item['is_dir']:
+                                sub_path = f'{cur_path}/{item["name"]}'
+                                if self._exclude and self._exclude.match(sub_path, item['name']):
+                                    self._metrics.incr('dirs_excluded')
+                                    continue
+                                changed = True
+                                if snapshot is not None:
+                                    old = snapshot.get(sub_path)
+                                    changed = not old or old.get('modified') != item.get('modified')
+                                if incremental and not changed:
+                                    continue
+                                modified[sub_path] = item.get('modified')
+                                refresh = bool(self._alist_token) and changed
+                                heapq.heappush(pending, (order(sub_path, _modified_ts(item.get('modified'))),
+                                                         next(seq), sub_path, refresh))
+                                if jobs:
+                                    jobs.set(sub_path, TransferJobs.PENDING, root=path)
+                            else:
+                                if os.path.splitext(item['name'])[-1].lower() not in settings.RMT_MEDIAEXT:
+                                    continue
+                                if not self._accept_file(f'{cur_path}/{item["name"]}', item):
+                                    self._metrics.incr('files_excluded')
+                                    continue
+                                hash_info = item.get('hash_info') or {}
+                                file = {
+                                    'name': item['name'],
+                                    'size': item['size'],
+                                    'sha1': hash_info.get('sha1', None),
+                                    'path': f'{path}/{item["name"]}',
+                                    'modified': item.get('modified'),
+                                }
+                                if content_index is not None:
+                                    src = f'{cur_path}/{item["name"]}'
+                                    seen.add(src)
+                                    if not self._dedup_file(content_index, src, file):
+                                        continue
+                                files.append(file)
+                        if jobs:
+                            if files:
+                                jobs.set(cur_path, TransferJobs.LISTED, root=path, files=files)
+                            else:
+                                jobs.remove(cur_path)
+                        if files:
+                            emit((cur_path, files), self._folder_key(order, cur_path, files, dir_modified))
+                    submit()
+                # 未列举的目录需保证下次同步时重新列举
+                if snapshot is not None:
+                    for _, _, sub_path, _ in pending:
+                        self._invalidate_snapshot(snapshot, sub_path)
+                if prune and not failed and not stop_event.is_set():
+                    content_index.prune(path, seen)
+
+        def run():
+            try:
+                walk()
+            except Exception as e:
+                logger.error(f'遍历目录{path}出错：{e}')
+            finally:
+                emit(None)
+
+        producer = threading.Thread(target=run, name='alist-walk', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = folders.get()[-1]
+                if item is None:
+                    break
+                yield item
+        finally:
+            # 调用方提前结束时通知遍历线程停止
+            stop_event.set()
+            producer.join()
+
+    def _folder_order_key(self) -> Callable[[str, float], Any]:
+        return self._folder_orders.get(self._folder_order) or self._folder_orders['newest']
+
+    @staticmethod
+    def _folder_key(order: Callable[[str, float], Any], folder: str, files: List[dict],
+                    modified: Optional[str] = None):
+        """
+        目录的排序值，修改时间取目录和其中最新文件的较大值
+        """
+        latest = max([_modified_ts(modified), *(_modified_ts(file.get('modified')) for file in files)])
+        return order(folder, latest)
+
+    def _dedup_file(self, content_index: ContentIndex, src: str, file: dict) -> bool:
+        """
+        按内容索引处理其他目录中已转移过的相同文件，返回是否需要转移
+        """
+        first = content_index.owner(file['sha1'], file['size'], src)
+        if not first:
+            return True
+        self._metrics.incr('files_duplicate')
+        if self._duplicate_mode == 'skip':
+            logger.debug(f'文件{src}与{first}相同，跳过')
+            return False
+        return True
+
+    def _accept_file(self, file_path: str, item: dict) -> bool:
+        """
+        按排除规则、包含规则和最小文件大小判断媒体文件是否需要转移
+        """
+        if self._min_file_size and (item.get('size') or 0) < self._min_file_size * 1024 * 1024:
+            return False
+        if self._exclude and self._exclude.match(file_path, item['name']):
+            return False
+        if self._include and not self._include.match(file_path, item['name']):
+            return False
+        return True
 
     def _alist_storage(self, storage_id):
-        if not self._alist_storage_id:
+        if not storage_id:
             return {}
         if not self._alist_host:
             return {}
@@ -586,24 +3160,62 @@ class FakeTransfer(_PluginBase):
         url = f'{self._alist_host}/api/admin/storage/get?id={storage_id}'
         headers = {'Content-Type': 'application/json'}
         headers.update({'Authorization': f'{self._alist_token}'})
-        response = requests.get(url, headers=headers)
+        response = self._http.get(url, headers=headers)
         return response.json()
 
-    def _get_refresh_token(self):
-        storage_info = self._alist_storage(self._alist_storage_id)['data']
+    def _get_refresh_token(self, account: AliyunAccount):
+        storage_info = self._alist_storage(account.storage_id).get('data')
         if not storage_info:
             return None
         if 'Aliyun' not in storage_info['driver']:
             return None
         data = json.loads(storage_info['addition'])
-        self._oauth_token_url = data['oauth_token_url']
+        account.oauth_token_url = data['oauth_token_url']
         return data['refresh_token']
 
-    def _aliyun_upload(self, file_name, size, sha1):
-        url = f'{self._aliyun_host}/adrive/v1.0/openFile/create'
-        payload = json.dumps({
-            "drive_id": self._aliyun_drive_id,
-            "parent_file_id": self._aliyun_parent_file_id,
+    def _aliyun_request(self, account: AliyunAccount, path: str, data: dict,
+                        priority: int = RateLimiter.INTERACTIVE) -> requests.Response:
+        """
+        请求阿里云盘开放接口：先经过限速，被限流(429)时按Retry-After降速后重试，
+        有多个账号时交互请求不等待，直接返回以便切换到其他账号
+        """
+        url = f'{self._aliyun_host}{path}'
+        payload = json.dumps(data)
+        failover = priority == RateLimiter.INTERACTIVE and len(self._accounts) > 1
+        response = None
+        for attempt in range(self._http_retries + 1):
+            if account.limiter:
+                start = time.time()
+                # 非交互请求限时等待，避免长时间占用定时任务线程
+                timeout = None if priority == RateLimiter.INTERACTIVE else self._aliyun_background_timeout
+                if not account.limiter.acquire(priority, timeout):
+                    raise Exception(f'等待账号{account.drive_id}限速超时')
+                self._metrics.observe('aliyun_wait', (time.time() - start) * 1000)
+            headers = {
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {self._load_token(account)}'
+            }
+            response = self._http.post(url, headers=headers, data=payload)
+            if response.status_code != 429:
+                if account.limiter:
+                    account.limiter.success()
+                return response
+            self._metrics.incr('aliyun_throttled')
+            retry_after = _retry_after(response)
+            if account.limiter:
+                account.limiter.throttle(retry_after)
+            if failover:
+                logger.warn(f'账号{account.drive_id}请求{path}被限流，切换其他账号')
+                return response
+            logger.warn(f'请求{path}被限流，{int(retry_after) if retry_after else "稍后"}秒后重试')
+            if not account.limiter and attempt < self._http_retries:
+                time.sleep(retry_after or 2 ** attempt)
+        return response
+
+    def _aliyun_upload(self, account: AliyunAccount, file_name, size, sha1, priority: int = RateLimiter.INTERACTIVE):
+        response = self._aliyun_request(account, '/adrive/v1.0/openFile/create', {
+            "drive_id": account.drive_id,
+            "parent_file_id": account.parent_file_id,
             "type": "file",
             "name": file_name,
             "check_name_mode": "refuse",
@@ -611,103 +3223,249 @@ class FakeTransfer(_PluginBase):
             "content_hash": sha1,
             "content_hash_name": "sha1",
             "proof_code": "DA76"
-        })
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self._load_token()}'
-        }
-
-        response = requests.post(url, headers=headers, data=payload)
+        }, priority)
 
         if response.status_code == 200:
-            return response.json()
+            ret = response.json()
+            if ret.get('file_id') and self._expire_enabled():
+                account.expiry.add(ret['file_id'], file_name, time.time() + self._max_hour * 3600)
+            return ret
         return {}
 
-    def _aliyun_download_url(self, file_name, size, sha1):
+    def _aliyun_download_url(self, file_name, size, sha1, priority: int = RateLimiter.INTERACTIVE):
+        """
+        按sha1选择账号秒传，账号被限流或失败时依次尝试其他账号
+        """
+        accounts = self._select_accounts(sha1)
+        for i, account in enumerate(accounts):
+            if not self._load_token(account):
+                logger.warn(f'账号{account.drive_id}的token无效，跳过')
+                continue
+            dl_url = self._aliyun_account_download_url(account, file_name, size, sha1, priority)
+            if dl_url:
+                return dl_url
+            if i < len(accounts) - 1:
+                self._metrics.incr('account_failovers')
+                logger.warn(f'账号{account.drive_id}秒传{file_name}失败，尝试下一个账号')
+        return None
 
-        if not self._aliyun_drive_id or not self._aliyun_parent_file_id:
-            return None
+    def _select_accounts(self, sha1: Optional[str]) -> List[AliyunAccount]:
+        """
+        按rendezvous哈希排序，相同文件固定使用同一账号以复用已秒传的文件，被限流的账号排在最后
+        """
+        accounts = sorted(self._accounts, key=lambda account: account.weight(sha1 or ''), reverse=True)
+        return sorted(accounts, key=lambda account: account.throttled())
+
+    @contextmanager
+    def _upload_slot(self, key: str):
+        """
+        相同文件同时只有一个线程秒传，其他线程等待后复用缓存的file_id，返回是否等待过
+        """
+        with self._upload_inflight_lock:
+            slot = self._upload_inflight.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        waited = not slot[0].acquire(blocking=False)
+        if waited:
+            slot[0].acquire()
+        try:
+            yield waited
+        finally:
+            slot[0].release()
+            with self._upload_inflight_lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    self._upload_inflight.pop(key, None)
+
+    def _aliyun_account_download_url(self, account: AliyunAccount, file_name, size, sha1,
+                                     priority: int = RateLimiter.INTERACTIVE):
+        cache_key = DownloadUrlCache.key(account.drive_id, sha1, size)
+        with self._upload_slot(cache_key) as waited:
+            dl_url = self._aliyun_cached_download_url(account, cache_key, priority)
+            if dl_url:
+                if waited:
+                    self._metrics.incr('uploads_shared')
+                return dl_url
+            return self._aliyun_new_download_url(account, cache_key, file_name, size, sha1, priority)
+
+    def _aliyun_cached_download_url(self, account: AliyunAccount, cache_key: str,
+                                    priority: int = RateLimiter.INTERACTIVE) -> Optional[str]:
+        """
+        相同文件优先复用缓存的下载地址和file_id
+        """
+        if self._url_cache:
+            dl_url = self._url_cache.get_url(cache_key)
+            if dl_url:
+                return dl_url
+            entry = self._url_cache.get(cache_key)
+            # 在清理前预留10分钟，避免使用即将被删除的文件
+            if entry and time.time() - entry['created'] < self._max_hour * 3600 - 600:
+                dl_url, expire = self._aliyun_get_download_url(account, entry['file_id'], priority)
+                if dl_url:
+                    self._url_cache.put(cache_key, entry['file_id'], entry['created'], dl_url, expire)
+                    return dl_url
+                self._url_cache.remove(cache_key)
+        return None
 
-        upload_ret = self._aliyun_upload(file_name, size, sha1)
+    def _aliyun_new_download_url(self, account: AliyunAccount, cache_key: str, file_name, size, sha1,
+                                 priority: int = RateLimiter.INTERACTIVE) -> Optional[str]:
+        upload_ret = self._aliyun_upload(account, file_name, size, sha1, priority)
         if not upload_ret:
             return None
         file_id = upload_ret['file_id']
-        url = f"{self._aliyun_host}/adrive/v1.0/openFile/getDownloadUrl"
+        created = time.time()
+        dl_url, expire = self._aliyun_get_download_url(account, file_id, priority)
+        if self._url_cache:
+            self._url_cache.put(cache_key, file_id, created, dl_url, expire)
+        return dl_url
 
-        payload = json.dumps({
-            "drive_id": self._aliyun_drive_id,
+    def _aliyun_get_download_url(self, account: AliyunAccount, file_id,
+                                 priority: int = RateLimiter.INTERACTIVE) -> Tuple[Optional[str], float]:
+        """
+        获取文件下载地址，返回 (下载地址, 过期时间戳)
+        """
+        response = self._aliyun_request(account, '/adrive/v1.0/openFile/getDownloadUrl', {
+            "drive_id": account.drive_id,
             "file_id": file_id
-        })
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self._load_token()}'
-        }
+        }, priority)
+        if response.status_code != 200:
+            return None, 0
+        ret = response.json()
+        # 下载地址默认15分钟有效
+        expire = time.time() + 900
+        if ret.get('expiration'):
+            try:
+                expire = datetime.strptime(ret['expiration'], "%Y-%m-%dT%H:%M:%S.%fZ") \
+                    .replace(tzinfo=pytz.utc).timestamp()
+            except ValueError:
+                pass
+        return ret['url'], expire
 
-        response = requests.post(url, headers=headers, data=payload)
-        if response.status_code == 200:
-            return response.json()['url']
-        return None
+    def _aliyun_file_list(self, account: AliyunAccount):
+        """
+        按创建时间分页遍历加速目录下的文件
+        """
+        marker = ''
+        while True:
+            response = self._aliyun_request(account, '/adrive/v1.0/openFile/list', {
+                "drive_id": account.drive_id,
+                "parent_file_id": account.parent_file_id,
+                "order_by": "created_at",
+                "limit": 100,
+                "marker": marker,
+            }, RateLimiter.BACKGROUND)
+            if response.status_code != 200:
+                logger.error(f'获取文件列表失败: {response.text}')
+                return
+            ret = response.json()
+            for item in ret['items']:
+                yield {
+                    'name': item['name'],
+                    'created_at': item['created_at'],
+                    'file_id': item['file_id'],
+                }
+            marker = ret.get('next_marker')
+            if not marker:
+                return
 
-    def _aliyun_file_list(self):
-        ret = []
-        url = f"{self._aliyun_host}/adrive/v1.0/openFile/list"
-        payload = json.dumps({
-            "drive_id": self._aliyun_drive_id,
-            "parent_file_id": self._aliyun_parent_file_id,
-            "order_by": "created_at",
-        })
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self._load_token()}'
-        }
-        response = requests.post(url, headers=headers, data=payload)
-        if response.status_code != 200:
-            logger.error(f'获取文件列表失败: {response.text}')
+    def _aliyun_clean_upload(self):
+        start_time = time.time()
+        summary = {'scanned': 0, 'deleted': 0, 'failed': 0}
+
+        def delete(account, item, hours):
+            ret = self._delete_upload(account, item['file_id'], item['name'])
+            logger.warn(f"文件{item['name']} 创建超过{hours}小时, 删除{'成功' if ret else '失败'}")
             return ret
-        for item in response.json()['items']:
-            ret.append({
-                'name': item['name'],
-                'created_at': item['created_at'],
-                'file_id': item['file_id'],
-            })
+
+        # 遍历完成后再删除，避免删除过程中翻页遗漏文件
+        expired = []
+        for account in self._accounts:
+            for item in self._aliyun_file_list(account):
+                summary['scanned'] += 1
+                # created_at为UTC时间
+                created_at = datetime.strptime(item['created_at'], "%Y-%m-%dT%H:%M:%S.%fZ")
+                hours = int((datetime.utcnow() - created_at).total_seconds() / 3600)
+                logger.debug(f"文件{item['name']} 创建时间 {item['created_at']}")
+                if hours >= self._max_hour:
+                    expired.append((account, item, hours))
+
+        with ThreadPoolExecutor(max_workers=self._clean_workers, thread_name_prefix='clean-upload') as executor:
+            futures = [executor.submit(delete, account, item, hours) for account, item, hours in expired]
+            for future in futures:
+                if future.result():
+                    summary['deleted'] += 1
+                else:
+                    summary['failed'] += 1
+
+        logger.info(f"清理加速文件完成，扫描{summary['scanned']}个，删除{summary['deleted']}个，"
+                    f"失败{summary['failed']}个，耗时{int(time.time() - start_time)}秒")
+        return summary
+
+    def _aliyun_expire_upload(self):
+        """
+        删除各账号过期索引中已到期的文件，失败的文件稍后重试
+        """
+        def delete(account, file_id, name, attempts):
+            if self._delete_upload(account, file_id, name):
+                logger.info(f'文件{name}已到期，删除成功')
+                return True
+            if attempts < self._expire_retries:
+                account.expiry.add(file_id, name, time.time() + 600, attempts + 1)
+            logger.warn(f'文件{name}已到期，删除失败')
+            return False
+
+        for account in self._accounts:
+            due = account.expiry.pop_due(time.time())
+            if due:
+                with ThreadPoolExecutor(max_workers=self._clean_workers,
+                                        thread_name_prefix='expire-upload') as executor:
+                    results = list(executor.map(lambda item: delete(account, *item), due))
+                logger.info(f'删除账号{account.drive_id}的到期文件{len(results)}个，成功{sum(results)}个')
+            # 新上传的文件也及时保存，避免插件异常退出后遗漏
+            if account.expiry.changed():
+                self.chain.save_cache(account.expiry.dumps(), account.cache_name(self._expiry_file_name))
+
+    def _expire_enabled(self) -> bool:
+        """
+        设置了超时时间和清理周期时才按过期索引删除加速文件
+        """
+        return bool(self._max_hour and self._max_hour > 0 and self._clean_rcon)
+
+    def _delete_upload(self, account: AliyunAccount, file_id, name) -> bool:
+        """
+        删除加速文件并清理对应的缓存和过期索引
+        """
+        try:
+            ret = self._delete_file(account, file_id)
+        except Exception as e:
+            logger.error(f"删除文件{name}出错：{e}")
+            return False
+        if ret:
+            if self._url_cache:
+                self._url_cache.remove_file(file_id)
+            account.expiry.remove(file_id)
         return ret
 
-    def _aliyun_clean_upload(self):
-        files = self._aliyun_file_list()
-        for item in files:
-            created_at = datetime.strptime(item['created_at'], "%Y-%m-%dT%H:%M:%S.%fZ")
-            hours = int((datetime.now() - created_at).total_seconds() / 3600)
-            logger.debug(f"文件{item['name']} 创建时间 {item['created_at']}")
-            if hours >= self._max_hour:
-                ret = self._delete_file(item['file_id'])
-                logger.warn(f"文件{item['name']} 创建超过{hours}小时, 删除{'成功' if ret else '失败'}")
-
-    def _delete_file(self, file_id):
-        url = f'{self._aliyun_host}/adrive/v1.0/openFile/delete'
-        payload = json.dumps({
-            "drive_id": self._aliyun_drive_id,
+    def _delete_file(self, account: AliyunAccount, file_id):
+        response = self._aliyun_request(account, '/adrive/v1.0/openFile/delete', {
+            "drive_id": account.drive_id,
             "file_id": file_id,
-        })
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self._load_token()}'
-        }
-        response = requests.post(url, headers=headers, data=payload)
+        }, RateLimiter.BACKGROUND)
         if response.status_code == 200:
             return True
         return False
 
-    def _aliyun_access_token(self):
-        if not self._refresh_token:
+    def _aliyun_access_token(self, account: AliyunAccount):
+        if not account.refresh_token:
             return None
         payload = json.dumps({
             "grant_type": "refresh_token",
-            "refresh_token": self._refresh_token
+            "refresh_token": account.refresh_token
         })
         headers = {
             'Content-Type': 'application/json'
         }
-        response = requests.post(self._oauth_token_url, headers=headers, data=payload)
+        # refresh_token使用后即失效，不能重试
+        response = self._http.post(account.oauth_token_url, headers=headers, data=payload, retry=False)
         if response.status_code == 200:
             return response.json()
         return None
\ No newline at end of file